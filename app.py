@@ -1,8 +1,14 @@
 from flask import Flask, render_template, redirect, url_for
-from flask_login import LoginManager, login_required
+from flask_login import LoginManager, login_required, current_user
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import config
 from models import db, User
+from assets import init_assets
+from ratelimit import limiter
+from replica import init_replica
+from presence import presence
+from outbox import init_outbox
 import os
 
 def create_app(config_name=None):
@@ -12,9 +18,19 @@ def create_app(config_name=None):
     config_name = config_name or os.environ.get('FLASK_ENV', 'default')
     app.config.from_object(config[config_name])
     
+    # Real client address/scheme from the proxy's X-Forwarded-* headers
+    hops = app.config['TRUSTED_PROXY_HOPS']
+    if hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+    
     # Extensions
     db.init_app(app)
     CORS(app)
+    init_assets(app)
+    limiter.init_app(app)
+    init_replica(app)
+    presence.init_app(app)
+    init_outbox(app)
     
     # Login Manager
     login_manager = LoginManager()
@@ -27,7 +43,7 @@ def create_app(config_name=None):
         return User.query.get(int(user_id))
     
     # Register blueprints
-    from routes import api
+    from routes import api, build_profiles_payload, build_matches_payload, build_points_payload
     app.register_blueprint(api)
     
     # Main routes
@@ -46,12 +62,21 @@ def create_app(config_name=None):
     @app.route('/dashboard')
     @login_required
     def dashboard():
-        return render_template('dashboard.html')
+        # Initial state embedded in the page - no follow-up API round trips
+        bootstrap = {
+            'matches': build_matches_payload(current_user, fields=['name', 'photo_url']),
+            'points': build_points_payload(current_user)
+        }
+        return render_template('dashboard.html', bootstrap=bootstrap)
     
     @app.route('/swipe')
     @login_required
     def swipe():
-        return render_template('swipe.html')
+        bootstrap = {
+            'profiles': build_profiles_payload(current_user),
+            'matches': build_matches_payload(current_user, fields=['id'])  # Unread badge only
+        }
+        return render_template('swipe.html', bootstrap=bootstrap)
     
     @app.route('/matches')
     @login_required
@@ -68,12 +93,20 @@ def create_app(config_name=None):
     def profile():
         return render_template('profile.html')
     
-    # Create tables
-    with app.app_context():
-        db.create_all()
+    # Create tables - development only, it inspects every table on each boot.
+    # Elsewhere run `python init_db.py` once per deploy.
+    if app.config['AUTO_CREATE_TABLES']:
+        with app.app_context():
+            db.create_all()
     
     return app
 
 if __name__ == '__main__':
+    # Development server only - for production use: gunicorn -c gunicorn.conf.py wsgi:app
+    from jobs import start_job_worker
+    
     app = create_app()
+    # The reloader runs this file twice - only the child that serves requests gets a worker
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_job_worker(app)
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,127 @@
+"""Cold archival of old chat messages.
+
+Messages older than MESSAGE_ARCHIVE_AFTER_DAYS, and every message of a
+match idle for MATCH_INACTIVE_DAYS, move out of the hot `messages` table
+into zlib-compressed per-match segments in `message_archives`. The chat API
+reads them back through get_message_history() when a user scrolls past the
+hot messages. Archived messages count as read - nothing can update them later.
+
+    python archive.py        # or enqueue('archive_messages')
+"""
+from datetime import datetime, timedelta
+from models import db, Message, MessageArchive
+import json
+import zlib
+
+
+def _serialize(messages):
+    return zlib.compress(json.dumps([
+        {
+            'id': m.id,
+            'sender_id': m.sender_id,
+            'content': m.content,
+            'created_at': m.created_at.isoformat(),
+            'is_read': True  # Archived rows can no longer be marked read - settle it now
+        } for m in messages
+    ], ensure_ascii=False).encode('utf-8'), 9)
+
+
+def archive_match(match_id, cutoff, segment_size=500):
+    """Move one match's messages created before `cutoff` into segments. Returns count moved."""
+    moved = 0
+    while True:
+        batch = Message.query.filter(
+            Message.match_id == match_id,
+            Message.created_at < cutoff
+        ).order_by(Message.id).limit(segment_size).all()
+        if not batch:
+            break
+
+        db.session.add(MessageArchive(
+            match_id=match_id,
+            first_message_id=batch[0].id,
+            last_message_id=batch[-1].id,
+            first_created_at=batch[0].created_at,
+            last_created_at=batch[-1].created_at,
+            message_count=len(batch),
+            data=_serialize(batch)
+        ))
+        Message.query.filter(Message.id.in_([m.id for m in batch])).delete(synchronize_session=False)
+
+        # One transaction per segment - a crash never loses or duplicates messages
+        db.session.commit()
+        moved += len(batch)
+
+    return moved
+
+
+def archive_messages(after_days=90, inactive_days=30, segment_size=500):
+    """Archive old messages across all matches, return number of messages moved"""
+    now = datetime.utcnow()
+    age_cutoff = now - timedelta(days=after_days)
+    inactive_cutoff = now - timedelta(days=inactive_days)
+
+    latest = db.session.query(
+        Message.match_id,
+        db.func.min(Message.created_at),
+        db.func.max(Message.created_at)
+    ).group_by(Message.match_id).all()
+
+    moved = 0
+    for match_id, oldest, newest in latest:
+        if newest < inactive_cutoff:
+            moved += archive_match(match_id, now, segment_size)  # Idle - archive everything
+        elif oldest < age_cutoff:
+            moved += archive_match(match_id, age_cutoff, segment_size)
+    return moved
+
+
+def get_message_history(match_id, before_id, limit=50):
+    """Up to `limit` messages with id < before_id, hot table first then archive.
+
+    Returns (messages oldest first, has_more).
+    """
+    hot = Message.query.filter(
+        Message.match_id == match_id,
+        Message.id < before_id
+    ).order_by(Message.id.desc()).limit(limit + 1).all()
+
+    messages = [m.to_dict() for m in hot[:limit]]
+    if len(hot) > limit:
+        return messages[::-1], True
+
+    bound = hot[-1].id if hot else before_id
+    segments = MessageArchive.query.filter(
+        MessageArchive.match_id == match_id,
+        MessageArchive.first_message_id < bound
+    ).order_by(MessageArchive.last_message_id.desc())
+
+    for segment in segments:
+        for message in reversed(segment.to_message_dicts()):
+            if message['id'] >= bound:
+                continue
+            if len(messages) == limit:
+                return messages[::-1], True
+            messages.append(message)
+
+    return messages[::-1], False
+
+
+def has_archived_messages(match_id, before_id=None):
+    query = MessageArchive.query.filter_by(match_id=match_id)
+    if before_id is not None:
+        query = query.filter(MessageArchive.first_message_id < before_id)
+    return db.session.query(query.exists()).scalar()
+
+
+if __name__ == '__main__':
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        moved = archive_messages(
+            app.config['MESSAGE_ARCHIVE_AFTER_DAYS'],
+            app.config['MATCH_INACTIVE_DAYS'],
+            app.config['MESSAGE_ARCHIVE_SEGMENT_SIZE']
+        )
+        print(f"Archived {moved} messages")
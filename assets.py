@@ -0,0 +1,125 @@
+"""Static asset pipeline: fingerprinted, precompressed CSS/JS.
+
+Build step (run on deploy, before starting the server):
+
+    python assets.py
+
+Copies static/css/*.css and static/js/*.js to static/dist/ with a content
+hash in the filename, writes .gz/.br variants next to them and a
+manifest.json mapping original -> fingerprinted name. When ASSETS_USE_MANIFEST
+is on, url_for('static', filename='css/styles.css') resolves to the
+fingerprinted file, which is served with immutable long-lived caching.
+"""
+from flask import request, send_from_directory
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+ASSET_DIRS = {'css': '.css', 'js': '.js'}
+
+ONE_YEAR = 365 * 24 * 60 * 60
+
+
+# === BUILD ===
+def build(static_dir=STATIC_DIR):
+    """Fingerprint and precompress all CSS/JS, return the manifest"""
+    # Build-time only dependency - not imported when the app boots
+    try:
+        import brotli
+    except ImportError:  # .br variants are skipped, gzip still works
+        brotli = None
+
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    manifest = {}
+
+    for subdir, extension in ASSET_DIRS.items():
+        source_dir = os.path.join(static_dir, subdir)
+        if not os.path.isdir(source_dir):
+            continue
+        os.makedirs(os.path.join(dist_dir, subdir), exist_ok=True)
+
+        for name in sorted(os.listdir(source_dir)):
+            if not name.endswith(extension):
+                continue
+
+            with open(os.path.join(source_dir, name), 'rb') as f:
+                content = f.read()
+
+            digest = hashlib.sha256(content).hexdigest()[:10]
+            stem = name[:-len(extension)]
+            hashed_name = f"{subdir}/{stem}.{digest}{extension}"
+            target = os.path.join(dist_dir, hashed_name)
+
+            with open(target, 'wb') as f:
+                f.write(content)
+            with open(target + '.gz', 'wb') as f:
+                f.write(gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(target + '.br', 'wb') as f:
+                    f.write(brotli.compress(content, quality=11))
+
+            manifest[f"{subdir}/{name}"] = f"{DIST_DIR}/{hashed_name}"
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    return manifest
+
+
+def load_manifest(static_dir=STATIC_DIR):
+    path = os.path.join(static_dir, DIST_DIR, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+# === SERVING ===
+def init_assets(app):
+    """Rewrite static URLs to fingerprinted names and serve them precompressed"""
+    if not app.config.get('ASSETS_USE_MANIFEST'):
+        return
+
+    manifest = load_manifest(app.static_folder)
+    if not manifest:
+        app.logger.warning("ASSETS_USE_MANIFEST is on but no manifest found - run `python assets.py`")
+        return
+
+    @app.url_defaults
+    def fingerprinted_static(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    default_static = app.view_functions['static']
+
+    def static(filename):
+        if not filename.startswith(DIST_DIR + '/'):
+            return default_static(filename=filename)
+
+        accepted = request.accept_encodings
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if accepted[encoding] and os.path.exists(os.path.join(app.static_folder, filename + suffix)):
+                response = send_from_directory(app.static_folder, filename + suffix, max_age=ONE_YEAR)
+                response.headers['Content-Encoding'] = encoding
+                # Keep the real type, not application/gzip
+                response.mimetype = mimetypes.guess_type(filename)[0]
+                break
+        else:
+            response = send_from_directory(app.static_folder, filename, max_age=ONE_YEAR)
+
+        response.headers['Cache-Control'] = f'public, max-age={ONE_YEAR}, immutable'
+        response.vary.add('Accept-Encoding')
+        return response
+
+    app.view_functions['static'] = static
+
+
+if __name__ == '__main__':
+    manifest = build()
+    for original, hashed in manifest.items():
+        print(f"{original} -> {hashed}")
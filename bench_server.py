@@ -0,0 +1,50 @@
+"""Throughput comparison: dev server vs gunicorn.
+
+Start the server under test first, then point this script at it:
+
+    python app.py                                  # dev server on :5000
+    python bench_server.py --url http://localhost:5000/api/health
+
+    gunicorn -c gunicorn.conf.py wsgi:app          # production on :5000
+    python bench_server.py --url http://localhost:5000/api/health
+"""
+import argparse
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def hit(url, count):
+    """Send `count` sequential requests, return list of latencies (seconds)"""
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            response.read()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run(url, requests_total, concurrency):
+    per_client = max(requests_total // concurrency, 1)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = pool.map(hit, [url] * concurrency, [per_client] * concurrency)
+        latencies = sorted(l for chunk in results for l in chunk)
+    elapsed = time.perf_counter() - start
+
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+    print(f"{url}")
+    print(f"  requests:    {len(latencies)} ({concurrency} concurrent clients)")
+    print(f"  throughput:  {len(latencies) / elapsed:.1f} req/s")
+    print(f"  latency p50: {p50 * 1000:.1f} ms, p99: {p99 * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:5000/api/health')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+    run(args.url, args.requests, args.concurrency)
@@ -0,0 +1,60 @@
+"""Startup latency: module import + create_app(), each in a fresh interpreter.
+
+Every sample is a new subprocess so nothing is already in sys.modules -
+this is what a gunicorn master (or a worker without preload) pays on boot.
+
+    python bench_startup.py                        # development vs production
+    python bench_startup.py --config production --runs 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app(sys.argv[1])
+created = time.perf_counter()
+print(json.dumps({'import': imported - start, 'create_app': created - imported}))
+"""
+
+
+def sample(config_name):
+    """Run one cold start in a subprocess, return {'import': s, 'create_app': s}"""
+    output = subprocess.check_output(
+        [sys.executable, '-c', PROBE, config_name],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stderr=subprocess.DEVNULL  # app log lines (e.g. missing asset manifest) are noise here
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run(config_name, runs):
+    samples = [sample(config_name) for _ in range(runs)]
+    print(f"{config_name} ({runs} cold starts)")
+    for phase in ('import', 'create_app'):
+        values = [s[phase] for s in samples]
+        print(f"  {phase + ':':12} p50 {percentile(values, 0.5) * 1000:7.1f} ms"
+              f"   p95 {percentile(values, 0.95) * 1000:7.1f} ms")
+    totals = [s['import'] + s['create_app'] for s in samples]
+    print(f"  {'total:':12} p50 {percentile(totals, 0.5) * 1000:7.1f} ms"
+          f"   p95 {percentile(totals, 0.95) * 1000:7.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure cold import + create_app latency')
+    parser.add_argument('--config', action='append', help='config name (repeatable), default: development and production')
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    for config_name in args.config or ['development', 'production']:
+        run(config_name, args.runs)
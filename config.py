@@ -8,6 +8,17 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///guideswipe.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Optional read replica - GET endpoints marked @replica_read query it
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+    SQLALCHEMY_BINDS = {'replica': REPLICA_DATABASE_URL} if REPLICA_DATABASE_URL else {}
+    REPLICA_STICKY_SECONDS = 5  # read from primary this long after a client's own write
+    
+    # Schema - create_all() on every create_app() (dev convenience, slows worker boot)
+    AUTO_CREATE_TABLES = False
+    
+    # Change feed - events per consumer batch (derived writes + checkpoint commit together)
+    OUTBOX_BATCH_SIZE = 500
+    
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
     
@@ -15,6 +26,48 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file upload
     UPLOAD_FOLDER = 'static/uploads'
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB per profile photo
+    
+    # Thumbnails (longest side in px) - 'card' is what swipe cards show
+    THUMBNAIL_SIZES = {'thumb': 160, 'card': 400, 'full': 1080}
+    THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS', 2))
+    
+    # Static assets - serve fingerprinted CSS/JS from static/dist (build with `python assets.py`)
+    ASSETS_USE_MANIFEST = False
+    
+    # Demo/test database snapshot (defaults to instance/seed_snapshot.db)
+    SNAPSHOT_PATH = os.environ.get('SNAPSHOT_PATH')
+    
+    # Background jobs
+    JOBS_WORKER_THREADS = int(os.environ.get('JOBS_WORKER_THREADS', 2))
+    JOBS_POLL_INTERVAL = 2.0  # seconds, for delayed retries
+    JOBS_RETRY_BASE_SECONDS = 5  # backoff: 5s, 10s, 20s, ...
+    JOBS_LOCK_TIMEOUT = 300  # running jobs older than this are retried
+    
+    # Chat archival - old/inactive conversations move to compressed segments
+    MESSAGE_ARCHIVE_AFTER_DAYS = 90
+    MATCH_INACTIVE_DAYS = 30
+    MESSAGE_ARCHIVE_SEGMENT_SIZE = 500
+    
+    # Presence - last_active is buffered in memory and flushed in bulk
+    PRESENCE_FLUSH_INTERVAL = 5  # seconds
+    PRESENCE_ONLINE_MINUTES = 5
+    PRESENCE_RECENT_HOURS = 24
+    
+    # Personalized deck - top K guides stored per user
+    RECOMMENDATIONS_TOP_K = 50
+    
+    # Admin access (exports) - comma-separated emails
+    ADMIN_EMAILS = {e.strip() for e in os.environ.get('ADMIN_EMAILS', '').split(',') if e.strip()}
+    
+    # Rate limiting - override per route as 'endpoint:scope': 'N/period'
+    RATELIMIT_ENABLED = True
+    RATELIMITS = {}
+    
+    # Reverse proxies in front of the app whose X-Forwarded-* headers are trusted.
+    # Off unless set - without a proxy any client could forge X-Forwarded-For and dodge
+    # per-IP rate limits. Behind one proxy set TRUSTED_PROXY_HOPS=1, or remote_addr is the proxy.
+    TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
     
     # Points system
     STARTING_POINTS = 50
@@ -24,13 +77,28 @@ class Config:
 class DevelopmentConfig(Config):
     DEBUG = True
     FLASK_ENV = 'development'
+    AUTO_CREATE_TABLES = True
 
 class ProductionConfig(Config):
     DEBUG = False
     FLASK_ENV = 'production'
+    ASSETS_USE_MANIFEST = True
+    
+    # Verify pooled connections before use - workers may sit idle between requests
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_pre_ping': True,
+        'pool_recycle': 1800
+    }
+
+class TestingConfig(Config):
+    TESTING = True
+    AUTO_CREATE_TABLES = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite:///guideswipe_test.db'
+    SNAPSHOT_PATH = os.environ.get('TEST_SNAPSHOT_PATH')
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
@@ -0,0 +1,41 @@
+"""Per-user swipe/match counters derived from the change feed.
+
+Maintained incrementally by the `user_stats` outbox consumer (registered in
+outbox.init_outbox) - each batch of swipe.created/match.created events
+becomes one delta per user, written in the same transaction as the consumer
+checkpoint. `python outbox.py replay
+user_stats` wipes the table and rebuilds it from the whole feed.
+"""
+from collections import defaultdict
+from models import db, UserStats
+
+LIKES = {'right', 'up'}
+
+
+def reset_user_stats():
+    UserStats.query.delete()
+
+
+def apply_user_stats(events):
+    deltas = defaultdict(lambda: defaultdict(int))
+    for event in events:
+        payload = event.payload
+        if event.event_type == 'swipe.created':
+            deltas[payload['swiper_id']]['swipes_sent'] += 1
+            if payload['direction'] in LIKES:
+                deltas[payload['swiped_id']]['likes_received'] += 1
+        elif event.event_type == 'match.created':
+            deltas[payload['user1_id']]['matches'] += 1
+            deltas[payload['user2_id']]['matches'] += 1
+
+    if not deltas:
+        return
+
+    existing = {s.user_id: s for s in UserStats.query.filter(UserStats.user_id.in_(list(deltas)))}
+    for user_id, changes in deltas.items():
+        stats = existing.get(user_id)
+        if stats is None:
+            stats = UserStats(user_id=user_id, swipes_sent=0, likes_received=0, matches=0)
+            db.session.add(stats)
+        for column, amount in changes.items():
+            setattr(stats, column, getattr(stats, column) + amount)
@@ -0,0 +1,144 @@
+"""Streaming NDJSON/CSV export of analytics tables.
+
+Rows are read in keyset-paginated batches (id > last id, LIMIT n) as plain
+Core rows - no ORM objects, no identity map - and each batch ends its read
+transaction before it is written out. Memory stays flat no matter how big
+the table is, and no long-lived read blocks SQLite writers for the length
+of the download. The `messages` export also streams archived messages from
+`message_archives` segments (first, in id order per segment), so rows moved
+out by archive.py are not missing. Incremental exports pass the last
+exported id (since_id) or a timestamp (since) as a watermark.
+
+    python export.py swipes --format csv --since-id 1000 > swipes.csv
+"""
+from datetime import datetime, timezone
+from models import db, Swipe, Match, Message, MessageArchive, PointTransaction
+import csv
+import enum
+import io
+import json
+import sys
+import zlib
+
+EXPORTS = {
+    'swipes': Swipe.__table__,
+    'matches': Match.__table__,
+    'messages': Message.__table__,
+    'point_transactions': PointTransaction.__table__
+}
+
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def parse_since(value):
+    """ISO timestamp -> naive UTC, the form created_at is stored in (offsets are converted, not dropped)"""
+    since = datetime.fromisoformat(value)
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+
+def _iter_table(table, since_id=None, since=None, batch_size=1000):
+    last_id = since_id or 0
+    while True:
+        query = db.select(table).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+        if since is not None:
+            query = query.where(table.c.created_at >= since)
+
+        rows = db.session.execute(query).mappings().all()
+        db.session.rollback()  # End the read transaction between batches - SQLite writers wait on open readers
+        if not rows:
+            return
+
+        for row in rows:
+            yield {key: _plain(value) for key, value in row.items()}
+        last_id = rows[-1]['id']
+
+
+def _iter_archived_messages(since_id=None, since=None, batch_size=20):
+    """Messages stored in archive segments, in Message row shape"""
+    last_segment_id = 0
+    while True:
+        query = MessageArchive.query.filter(MessageArchive.id > last_segment_id)
+        if since_id is not None:
+            query = query.filter(MessageArchive.last_message_id > since_id)
+        if since is not None:
+            query = query.filter(MessageArchive.last_created_at >= since)
+
+        segments = [(s.id, s.match_id, s.data) for s in query.order_by(MessageArchive.id).limit(batch_size)]
+        db.session.rollback()
+        if not segments:
+            return
+
+        for segment_id, match_id, data in segments:
+            for message in json.loads(zlib.decompress(data)):
+                if since_id is not None and message['id'] <= since_id:
+                    continue
+                if since is not None and datetime.fromisoformat(message['created_at']) < since:
+                    continue
+                yield {
+                    'id': message['id'],
+                    'match_id': match_id,
+                    'sender_id': message['sender_id'],
+                    'content': message['content'],
+                    'created_at': message['created_at'],
+                    'is_read': message['is_read']
+                }
+        last_segment_id = segments[-1][0]
+
+
+def iter_rows(name, since_id=None, since=None, batch_size=1000):
+    """Yield export rows as dicts in id order (archived messages first for `messages`)"""
+    if name == 'messages':
+        yield from _iter_archived_messages(since_id, since)
+    yield from _iter_table(EXPORTS[name], since_id, since, batch_size)
+
+
+def generate_export(name, fmt='ndjson', since_id=None, since=None, batch_size=1000):
+    """Yield the export as text chunks (one per batch of rows)"""
+    columns = [column.name for column in EXPORTS[name].columns]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns) if fmt == 'csv' else None
+    if writer:
+        writer.writeheader()
+
+    count = 0
+    for row in iter_rows(name, since_id, since, batch_size):
+        if writer:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+if __name__ == '__main__':
+    import argparse
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description='Stream a table export to stdout')
+    parser.add_argument('table', choices=sorted(EXPORTS))
+    parser.add_argument('--format', choices=sorted(CONTENT_TYPES), default='ndjson')
+    parser.add_argument('--since-id', type=int)
+    parser.add_argument('--since', type=parse_since, help='ISO timestamp, naive means UTC, e.g. 2025-10-01T00:00:00')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        for chunk in generate_export(args.table, args.format, args.since_id, args.since):
+            sys.stdout.write(chunk)
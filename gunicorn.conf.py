@@ -0,0 +1,60 @@
+"""Gunicorn settings for production serving.
+
+Schema first (once per deploy):  python init_db.py production
+Run with:  gunicorn -c gunicorn.conf.py wsgi:app
+Behind a reverse proxy also set TRUSTED_PROXY_HOPS=1 so per-IP rate limits see client addresses.
+
+Deploying new code without dropping requests - preload_app means HUP only
+re-forks workers from the code the master already imported, so use a
+binary upgrade instead:
+    kill -USR2 <master pid>        # new master + workers boot the new code
+    kill -WINCH <old master pid>   # old workers finish in-flight requests and exit
+    kill -QUIT <old master pid>    # (or -HUP it to roll back before QUIT)
+With GUNICORN_PIDFILE set, the old master's pid moves to <pidfile>.oldbin.
+"""
+import multiprocessing
+import os
+
+# === SERVER ===
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'  # threads per worker - requests mostly wait on the DB
+
+# Load the app once in the master, workers fork from it (faster boot, shared memory).
+# Code changes need a USR2 binary upgrade (see above), HUP does not reload them.
+preload_app = True
+pidfile = os.environ.get('GUNICORN_PIDFILE') or None
+
+# === CONNECTIONS ===
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))  # seconds, keep above proxy idle timeout
+backlog = int(os.environ.get('GUNICORN_BACKLOG', 2048))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Recycle workers periodically to cap slow memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# === LOGGING ===
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-') or None  # empty disables
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """Drop DB connections inherited from the master - each worker opens its own"""
+    from models import db
+
+    app = worker.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    """Each worker runs background job threads (set JOBS_WORKER_THREADS=0 to use `python jobs.py` instead)"""
+    from jobs import start_job_worker
+
+    app = worker.app.wsgi()
+    if app.config['JOBS_WORKER_THREADS']:
+        start_job_worker(app)
@@ -0,0 +1,141 @@
+import hashlib
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Lazily created per process - a pool created before gunicorn forks would be shared by all workers
+_thumbnail_pool = None
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class InvalidImage(Exception):
+    pass
+
+
+# === UPLOAD STORAGE ===
+def save_upload_stream(file, upload_dir, max_size):
+    """Copy an upload to disk in chunks, content-addressed by SHA-256.
+
+    Werkzeug has already spooled the multipart body to a temp file by the
+    time this runs - the request-level size check happens in the view, on
+    Content-Length, before request.files is touched. max_size here is the
+    per-file limit. Returns (digest, filename); identical uploads map to the
+    same file, so a re-upload just reuses what is already on disk.
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    extension = file.filename.rsplit('.', 1)[1].lower()
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(f"File too large (max {max_size // (1024 * 1024)}MB)")
+                digest.update(chunk)
+                out.write(chunk)
+
+        hexdigest = digest.hexdigest()
+        filename = f"{hexdigest}.{extension}"
+        final_path = os.path.join(upload_dir, filename)
+
+        if os.path.exists(final_path):
+            os.remove(tmp_path)  # Dedupe - already stored
+        else:
+            os.replace(tmp_path, final_path)
+
+        return hexdigest, filename
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def verify_image(path):
+    """Raise InvalidImage (and drop the file) unless Pillow can parse it"""
+    from PIL import Image  # Lazy - only upload requests pay for Pillow
+
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception:
+        os.remove(path)  # Content-addressed, so nothing valid can share this name
+        raise InvalidImage("Not a valid image file")
+
+
+# === THUMBNAILS ===
+def thumbnail_filename(digest, size_name):
+    return f"{digest}_{size_name}.jpg"
+
+
+def thumbnails_exist(upload_dir, digest, sizes):
+    return all(
+        os.path.exists(os.path.join(upload_dir, thumbnail_filename(digest, name)))
+        for name in sizes
+    )
+
+
+def generate_thumbnails(source_path, upload_dir, digest, sizes):
+    """Resize source image into every configured size (runs in the process pool)"""
+    # Imported here, not at module level - Pillow is only needed in pool processes
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+        for name, max_side in sizes.items():
+            target = os.path.join(upload_dir, thumbnail_filename(digest, name))
+            if os.path.exists(target):
+                continue
+
+            variant = image.copy()
+            variant.thumbnail((max_side, max_side), Image.LANCZOS)
+
+            # Write then rename so a half-written thumbnail is never served
+            tmp_path = target + '.part'
+            variant.save(tmp_path, 'JPEG', quality=85, optimize=True, progressive=True)
+            os.replace(tmp_path, target)
+
+    return digest
+
+
+def _log_thumbnail_result(future):
+    error = future.exception()
+    if error:
+        logger.error("Thumbnail generation failed: %s", error)
+
+
+def get_thumbnail_pool(max_workers):
+    global _thumbnail_pool
+    if _thumbnail_pool is None:
+        from concurrent.futures import ProcessPoolExecutor  # pulls in multiprocessing, keep off app boot
+        import multiprocessing
+        # Never fork the worker - children would inherit its threads and open DB connections
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _thumbnail_pool = ProcessPoolExecutor(max_workers=max_workers,
+                                              mp_context=multiprocessing.get_context(method))
+    return _thumbnail_pool
+
+
+def schedule_thumbnails(source_path, upload_dir, digest, sizes, max_workers=2):
+    """Queue thumbnail generation off the request path. Returns future or None if already done"""
+    if thumbnails_exist(upload_dir, digest, sizes):
+        return None
+
+    future = get_thumbnail_pool(max_workers).submit(
+        generate_thumbnails, source_path, upload_dir, digest, sizes
+    )
+    future.add_done_callback(_log_thumbnail_result)
+    return future
@@ -0,0 +1,88 @@
+from app import create_app
+from models import db, Profile, Message, MessageArchive
+from utils import reconcile_rating_aggregates
+import sys
+
+# Columns added to tables that existed before - create_all() never alters a table
+ADDED_COLUMNS = {
+    'profiles': {
+        'rating_sum': 'INTEGER NOT NULL DEFAULT 0',
+        'weighted_rating': f'FLOAT DEFAULT {Profile.RATING_PRIOR_MEAN}',
+    },
+}
+
+
+def upgrade_schema():
+    """Bring tables created by an older version up to the current models.
+
+    Idempotent - every step checks first, so it is safe on every deploy.
+    Returns a list of the steps that were applied.
+    """
+    applied = []
+
+    with db.engine.begin() as conn:
+        inspector = db.inspect(conn)
+        # 1. Missing columns
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {column['name'] for column in inspector.get_columns(table)}
+            for name, ddl in columns.items():
+                if name not in existing:
+                    conn.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {name} {ddl}')
+                    applied.append(f'{table}.{name} added')
+
+        # 2. Messages ids must never be reused (AUTOINCREMENT) - SQLite can only rebuild the table
+        if conn.dialect.name == 'sqlite':
+            create_sql = conn.exec_driver_sql(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'messages'"
+            ).scalar()
+            if 'AUTOINCREMENT' not in create_sql.upper():
+                _rebuild_messages(conn)
+                applied.append('messages rebuilt with AUTOINCREMENT')
+
+        # 3. Indexes on existing tables (new tables got theirs from create_all)
+        inspector = db.inspect(conn)  # fresh - the rebuild above changed the schema
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name not in {existing['name'] for existing in inspector.get_indexes(table.name)}:
+                    index.create(conn)
+                    applied.append(f'index {index.name} created')
+
+    # 4. Backfill the new rating columns from the reviews table
+    if any(step.startswith('profiles.') for step in applied):
+        fixed = reconcile_rating_aggregates(fix=True)
+        applied.append(f'rating aggregates backfilled for {len(fixed)} profiles')
+
+    return applied
+
+
+def _rebuild_messages(conn):
+    columns = ', '.join(column.name for column in Message.__table__.columns)
+
+    conn.exec_driver_sql('ALTER TABLE messages RENAME TO _messages_old')
+    for (index_name,) in conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = '_messages_old' AND sql IS NOT NULL"
+    ).all():
+        conn.exec_driver_sql(f'DROP INDEX {index_name}')
+
+    Message.__table__.create(conn)
+    conn.exec_driver_sql(f'INSERT INTO messages ({columns}) SELECT {columns} FROM _messages_old')
+    conn.exec_driver_sql('DROP TABLE _messages_old')
+
+    # Archived messages are gone from the table - start the sequence above them too
+    high_water = max(
+        conn.execute(db.select(db.func.max(Message.id))).scalar() or 0,
+        conn.execute(db.select(db.func.max(MessageArchive.last_message_id))).scalar() or 0
+    )
+    conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'messages'")
+    conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES ('messages', ?)", (high_water,))
+
+
+# Create missing tables and upgrade existing ones without touching data (run once per deploy)
+if __name__ == '__main__':
+    app = create_app(sys.argv[1] if len(sys.argv) > 1 else None)
+
+    with app.app_context():
+        db.create_all()
+        for step in upgrade_schema():
+            print(f"  {step}")
+        print("Database initialized")
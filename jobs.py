@@ -0,0 +1,243 @@
+"""In-process background jobs for post-commit side effects.
+
+Jobs are rows in the `jobs` table, added to the same session as the change
+that triggers them, so they exist only if that transaction commits. Worker
+threads are woken right after commit and also poll for delayed retries.
+
+    enqueue('send_welcome_message', match_id=match.id)   # inside a request
+    python jobs.py                                      # standalone worker
+"""
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from models import db, Job
+from utils import send_welcome_message, reconcile_rating_aggregates, set_profile_photo
+from images import schedule_thumbnails
+from archive import archive_messages
+from outbox import run_consumers
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+_wakeup = threading.Event()
+
+
+def job(name):
+    """Register a function as a job handler"""
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, max_attempts=5, delay=0, **payload):
+    """Add job to the current transaction - it runs only if the transaction commits"""
+    if name not in _handlers:
+        raise ValueError(f"Unknown job: {name}")
+
+    job_row = Job(
+        name=name,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_at=datetime.utcnow() + timedelta(seconds=delay)
+    )
+    db.session.add(job_row)
+    db.session.info['jobs_enqueued'] = True
+    return job_row
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_workers_after_commit(session):
+    if session.info.pop('jobs_enqueued', False):
+        _wakeup.set()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('jobs_enqueued', None)
+
+
+# === EXECUTION ===
+def _claim_next(lock_timeout):
+    """Atomically move one due job to 'running', return its id or None"""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=lock_timeout)
+
+    candidates = db.session.query(Job.id).filter(
+        db.or_(
+            db.and_(Job.status == 'pending', Job.run_at <= now),
+            db.and_(Job.status == 'running', Job.locked_at < stale)  # Worker died mid-job
+        )
+    ).order_by(Job.run_at).limit(5).all()
+
+    for (job_id,) in candidates:
+        # Conditional update - only one worker wins the row
+        claimed = Job.query.filter(
+            Job.id == job_id,
+            db.or_(Job.status == 'pending', db.and_(Job.status == 'running', Job.locked_at < stale))
+        ).update({'status': 'running', 'locked_at': now}, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return job_id
+
+    return None
+
+
+def _backoff(attempts, base, cap=3600):
+    return min(base * 2 ** (attempts - 1), cap)
+
+
+def run_job(job_id, retry_base=5):
+    job_row = Job.query.get(job_id)
+    handler = _handlers.get(job_row.name)
+
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for {job_row.name}")
+        # Non-idempotent handlers leave the commit to us - their writes and the 'done' status
+        # commit together, so a failed status commit or a dead worker retries without duplicates
+        handler(**(job_row.payload or {}))
+        job_row.status = 'done'
+        job_row.attempts += 1
+        job_row.last_error = None
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        job_row = Job.query.get(job_id)
+        job_row.attempts += 1
+        job_row.last_error = str(e)
+        if job_row.attempts >= job_row.max_attempts:
+            job_row.status = 'failed'
+            logger.error("Job %s (%s) failed permanently: %s", job_id, job_row.name, e)
+        else:
+            job_row.status = 'pending'
+            job_row.run_at = datetime.utcnow() + timedelta(seconds=_backoff(job_row.attempts, retry_base))
+        db.session.commit()
+
+
+def run_pending(app, limit=None):
+    """Run due jobs in the calling thread until none are left - handy in tests and scripts"""
+    processed = 0
+    with app.app_context():
+        while limit is None or processed < limit:
+            job_id = _claim_next(app.config['JOBS_LOCK_TIMEOUT'])
+            if job_id is None:
+                break
+            run_job(job_id, app.config['JOBS_RETRY_BASE_SECONDS'])
+            processed += 1
+        db.session.remove()
+    return processed
+
+
+class JobWorker:
+    """Pool of daemon threads draining the jobs table"""
+
+    def __init__(self, app, threads=2, poll_interval=2.0):
+        self.app = app
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._workers = []
+
+    def start(self):
+        for i in range(self.threads):
+            worker = threading.Thread(target=self._loop, name=f'job-worker-{i}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        _wakeup.set()
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                processed = run_pending(self.app)
+            except Exception:
+                logger.exception("Job worker iteration failed")
+                processed = 0
+
+            if not processed:
+                _wakeup.wait(self.poll_interval)
+                _wakeup.clear()
+
+
+def start_job_worker(app):
+    return JobWorker(
+        app,
+        threads=app.config['JOBS_WORKER_THREADS'],
+        poll_interval=app.config['JOBS_POLL_INTERVAL']
+    ).start()
+
+
+# === JOB HANDLERS ===
+@job('send_welcome_message')
+def welcome_message_job(match_id):
+    send_welcome_message(match_id)
+
+
+@job('apply_profile_photo')
+def apply_profile_photo_job(user_id, filename):
+    # Resize in the process pool, switch the profile only once every variant is on disk
+    config = current_app.config
+    upload_dir = os.path.join(current_app.root_path, config['UPLOAD_FOLDER'])
+    digest = filename.rsplit('.', 1)[0]
+    future = schedule_thumbnails(
+        os.path.join(upload_dir, filename), upload_dir, digest, config['THUMBNAIL_SIZES'],
+        max_workers=config['THUMBNAIL_WORKERS']
+    )
+    if future:
+        future.result()  # Raises on a failed resize - the job is retried with backoff
+    set_profile_photo(user_id, digest, config['THUMBNAIL_SIZES'])
+
+
+@job('reconcile_ratings')
+def reconcile_ratings_job(fix=True):
+    mismatches = reconcile_rating_aggregates(fix=fix)
+    if mismatches:
+        logger.warning("Rating aggregates out of sync for %d profiles: %s", len(mismatches), mismatches)
+
+
+@job('archive_messages')
+def archive_messages_job():
+    config = current_app.config
+    moved = archive_messages(
+        config['MESSAGE_ARCHIVE_AFTER_DAYS'],
+        config['MATCH_INACTIVE_DAYS'],
+        config['MESSAGE_ARCHIVE_SEGMENT_SIZE']
+    )
+    logger.info("Archived %d messages", moved)
+
+
+@job('build_recommendations')
+def build_recommendations_job():
+    # NumPy/SciPy imported here so web workers never load them
+    from recommendations import build_recommendations
+
+    users = build_recommendations(current_app.config['RECOMMENDATIONS_TOP_K'])
+    logger.info("Recommendations built for %d users", users)
+
+
+@job('run_outbox_consumers')
+def run_outbox_consumers_job():
+    results = run_consumers(current_app.config['OUTBOX_BATCH_SIZE'])
+    logger.info("Outbox consumers processed: %s", results)
+
+
+if __name__ == '__main__':
+    from app import create_app
+
+    app = create_app()
+    worker = start_job_worker(app)
+    print(f"Job worker running with {worker.threads} threads (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        worker.stop()
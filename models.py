@@ -1,10 +1,33 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_login import UserMixin
 from datetime import datetime, timezone
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.orm import Session as OrmSession
+from sqlalchemy.sql import Select
 from werkzeug.security import generate_password_hash, check_password_hash
 import enum
+import json
+import zlib
 
-db = SQLAlchemy()
+class RoutingSession(Session):
+    """Sends plain SELECTs to the 'replica' bind when session.info['use_replica'] is set.
+    
+    Flushes and UPDATE/DELETE statements always go to the primary (see replica.py).
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and self.info.get('use_replica')
+            and not self._flushing
+            and (clause is None or isinstance(clause, Select))
+            and 'replica' in self._db.engines
+        ):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # === USER MODEL ===
 class User(UserMixin, db.Model):
@@ -63,14 +86,14 @@ class User(UserMixin, db.Model):
         else:
             return {"level": 4, "name": "Legenda"}
 
-    def to_dict(self):
+    def to_dict(self, profile_fields=None):
         return {
             'id': self.id,
             'email': self.email,
             'points_balance': self.points_balance,
             'level': self.get_level(),
             'created_at': self.created_at.isoformat(),
-            'profile': self.profile.to_dict() if self.profile else None
+            'profile': self.profile.to_dict(profile_fields) if self.profile else None
         }
 
 # === PROFILE MODEL ===
@@ -102,44 +125,108 @@ class Profile(db.Model):
     languages = db.Column(db.JSON)  # Array of languages
     availability = db.Column(db.JSON)  # Availability schedule
     
-    # Ratings
+    # Bayesian prior: a new guide starts as if they had RATING_PRIOR_WEIGHT reviews of RATING_PRIOR_MEAN
+    RATING_PRIOR_MEAN = 4.0
+    RATING_PRIOR_WEIGHT = 5
+    
+    # Ratings - rating_sum/total_reviews are the exact aggregates, average_rating
+    # and weighted_rating are derived from them on every review write
     average_rating = db.Column(db.Float, default=0.0)
     total_reviews = db.Column(db.Integer, default=0)
+    rating_sum = db.Column(db.Integer, default=0, nullable=False)
+    weighted_rating = db.Column(db.Float, default=RATING_PRIOR_MEAN, index=True)  # Bayesian, deck sort key
     total_bookings = db.Column(db.Integer, default=0)
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    last_active = db.Column(db.DateTime, default=datetime.utcnow)
-
+    last_active = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # written by presence.py
+    
     def update_rating(self, new_rating):
-        """Update average rating with new review"""
-        total_score = self.average_rating * self.total_reviews
-        self.total_reviews += 1
-        self.average_rating = (total_score + new_rating) / self.total_reviews
+        """Add a review to the aggregates.
+        
+        Assigns SQL expressions, so the flush issues
+        `SET rating_sum = rating_sum + :rating, ...` - concurrent reviews
+        never overwrite each other and integer sums never drift.
+        """
+        cls = type(self)
+        new_sum = cls.rating_sum + new_rating
+        new_count = cls.total_reviews + 1
+        
+        self.rating_sum = new_sum
+        self.total_reviews = new_count
+        self.average_rating = new_sum * 1.0 / new_count
+        self.weighted_rating = (
+            (self.RATING_PRIOR_MEAN * self.RATING_PRIOR_WEIGHT + new_sum) * 1.0
+            / (self.RATING_PRIOR_WEIGHT + new_count)
+        )
+    
+    def set_rating_aggregates(self, rating_sum, review_count):
+        """Overwrite aggregates from known totals (seeding, reconcile)"""
+        self.rating_sum = rating_sum
+        self.total_reviews = review_count
+        self.average_rating = rating_sum / review_count if review_count else 0.0
+        self.weighted_rating = (
+            (self.RATING_PRIOR_MEAN * self.RATING_PRIOR_WEIGHT + rating_sum)
+            / (self.RATING_PRIOR_WEIGHT + review_count)
+        )
         
     def is_guide(self):
         return self.profile_type in [ProfileType.GUIDE, ProfileType.BOTH]
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'name': self.name,
-            'age': self.age,
-            'bio': self.bio,
-            'location': self.location,
-            'photo_url': self.photo_url,
-            'photos': self.photos or [],
-            'profile_type': self.profile_type.value,
-            'hourly_rate': self.hourly_rate,
-            'specialties': self.specialties or [],
-            'languages': self.languages or [],
-            'average_rating': round(self.average_rating, 1),
-            'total_reviews': self.total_reviews,
-            'total_bookings': self.total_bookings,
-            'is_guide': self.is_guide()
+    # Serialized field -> columns it reads. Sparse fieldsets (?fields=) load only these.
+    FIELD_COLUMNS = {
+        'id': ('id',),
+        'user_id': ('user_id',),
+        'name': ('name',),
+        'age': ('age',),
+        'bio': ('bio',),
+        'location': ('location',),
+        'photo_url': ('photo_url',),
+        'photos': ('photos',),
+        'profile_type': ('profile_type',),
+        'hourly_rate': ('hourly_rate',),
+        'specialties': ('specialties',),
+        'languages': ('languages',),
+        'average_rating': ('average_rating',),
+        'total_reviews': ('total_reviews',),
+        'weighted_rating': ('weighted_rating',),
+        'total_bookings': ('total_bookings',),
+        'last_active': ('last_active',),
+        'is_guide': ('profile_type',)
+    }
+    
+    @classmethod
+    def load_only_columns(cls, fields):
+        """Column attributes needed to serialize `fields` (keys always included)"""
+        names = {'id', 'user_id'}
+        for field in fields:
+            names.update(cls.FIELD_COLUMNS[field])
+        return [getattr(cls, name) for name in sorted(names)]
+    
+    def to_dict(self, fields=None):
+        # Values are computed per requested field so unloaded (deferred) columns are never touched
+        serializers = {
+            'id': lambda: self.id,
+            'user_id': lambda: self.user_id,
+            'name': lambda: self.name,
+            'age': lambda: self.age,
+            'bio': lambda: self.bio,
+            'location': lambda: self.location,
+            'photo_url': lambda: self.photo_url,
+            'photos': lambda: self.photos or [],
+            'profile_type': lambda: self.profile_type.value,
+            'hourly_rate': lambda: self.hourly_rate,
+            'specialties': lambda: self.specialties or [],
+            'languages': lambda: self.languages or [],
+            'average_rating': lambda: round(self.average_rating, 1),
+            'total_reviews': lambda: self.total_reviews,
+            'weighted_rating': lambda: round(self.weighted_rating or 0.0, 2),
+            'total_bookings': lambda: self.total_bookings,
+            'last_active': lambda: self.last_active.isoformat() if self.last_active else None,
+            'is_guide': lambda: self.is_guide()
         }
+        return {field: serializers[field]() for field in (fields or serializers)}
 
 # === SWIPE MODEL ===
 class SwipeDirection(enum.Enum):
@@ -162,6 +249,21 @@ class Swipe(db.Model):
     def is_like(self):
         return self.direction in [SwipeDirection.RIGHT, SwipeDirection.UP]
 
+# === RECOMMENDATION MODEL ===
+class Recommendation(db.Model):
+    """Precomputed top-K guides per user (rebuilt offline by recommendations.py)"""
+    __tablename__ = 'recommendations'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    guide_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)  # 0 = best
+    score = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Deck reads one user's list in rank order
+    __table_args__ = (db.Index('ix_recommendations_user_rank', 'user_id', 'rank'),)
+
 # === MATCH MODEL ===
 class Match(db.Model):
     __tablename__ = 'matches'
@@ -172,8 +274,9 @@ class Match(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
     
-    # Messages relationship
-    messages = db.relationship('Message', backref='match', cascade='all, delete-orphan')
+    # Messages relationship - dynamic so long histories are queried, never loaded whole
+    messages = db.relationship('Message', backref='match', cascade='all, delete-orphan', lazy='dynamic')
+    archives = db.relationship('MessageArchive', backref='match', cascade='all, delete-orphan', lazy='dynamic')
     
     # Relationships
     user1 = db.relationship('User', foreign_keys=[user1_id])
@@ -183,14 +286,23 @@ class Match(db.Model):
         """Get the other user in this match"""
         return self.user2 if self.user1_id == user_id else self.user1
     
-    def to_dict(self, current_user_id):
+    def to_dict(self, current_user_id, profile_fields=None):
         other_user = self.get_other_user(current_user_id)
         return {
             'id': self.id,
-            'other_user': other_user.to_dict(),
+            'other_user': other_user.to_dict(profile_fields),
             'created_at': self.created_at.isoformat(),
-            'last_message': self.messages[-1].to_dict() if self.messages else None
+            'last_message': self.get_last_message_dict()
         }
+    
+    def get_last_message_dict(self):
+        last_message = self.messages.order_by(Message.id.desc()).first()
+        if last_message:
+            return last_message.to_dict()
+        
+        # Whole conversation may have gone to the archive
+        last_segment = self.archives.order_by(MessageArchive.last_message_id.desc()).first()
+        return last_segment.to_message_dicts()[-1] if last_segment else None
 
 # === MESSAGE MODEL ===
 class Message(db.Model):
@@ -206,6 +318,9 @@ class Message(db.Model):
     # Relationship
     sender = db.relationship('User', backref='sent_messages')
     
+    # Ids must never be reused - scroll-back pages hot rows and archive segments by id
+    __table_args__ = {'sqlite_autoincrement': True}
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -217,6 +332,37 @@ class Message(db.Model):
             'is_read': self.is_read
         }
 
+# === MESSAGE ARCHIVE MODEL ===
+class MessageArchive(db.Model):
+    """Compressed segment of old messages for one match (see archive.py)"""
+    __tablename__ = 'message_archives'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id'), nullable=False)
+    first_message_id = db.Column(db.Integer, nullable=False)
+    last_message_id = db.Column(db.Integer, nullable=False)
+    first_created_at = db.Column(db.DateTime)
+    last_created_at = db.Column(db.DateTime)
+    message_count = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed JSON list
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Scroll-back walks segments newest first
+    __table_args__ = (db.Index('ix_message_archives_match_last', 'match_id', 'last_message_id'),)
+    
+    def to_message_dicts(self):
+        """Archived messages in Message.to_dict() shape, oldest first"""
+        messages = json.loads(zlib.decompress(self.data))
+        names = dict(
+            db.session.query(Profile.user_id, Profile.name)
+                      .filter(Profile.user_id.in_({m['sender_id'] for m in messages})).all()
+        )
+        for message in messages:
+            message['match_id'] = self.match_id
+            message['sender_name'] = names.get(message['sender_id'], 'Unknown')
+            message['is_read'] = True  # Segments written before archive.py settled the flag
+        return messages
+
 # === POINT TRANSACTION MODEL ===
 class PointTransaction(db.Model):
     __tablename__ = 'point_transactions'
@@ -239,6 +385,37 @@ class PointTransaction(db.Model):
             'type': 'earned' if self.amount > 0 else 'spent'
         }
 
+# === REVIEW MODEL ===
+class Review(db.Model):
+    __tablename__ = 'reviews'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    reviewer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    guide_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    rating = db.Column(db.Integer, nullable=False)  # 1-5 stars
+    comment = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.CheckConstraint('rating BETWEEN 1 AND 5', name='ck_reviews_rating'),
+        db.UniqueConstraint('reviewer_id', 'guide_id', name='uq_reviews_reviewer_guide')  # One review per guide
+    )
+    
+    # Relationships
+    reviewer = db.relationship('User', foreign_keys=[reviewer_id])
+    guide = db.relationship('User', foreign_keys=[guide_id])
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'reviewer_id': self.reviewer_id,
+            'reviewer_name': self.reviewer.profile.name if self.reviewer.profile else 'Unknown',
+            'guide_id': self.guide_id,
+            'rating': self.rating,
+            'comment': self.comment,
+            'created_at': self.created_at.isoformat()
+        }
+
 # === BOOKING MODEL (for future) ===
 class Booking(db.Model):
     __tablename__ = 'bookings'
@@ -254,3 +431,120 @@ class Booking(db.Model):
     # Relationships
     tourist = db.relationship('User', foreign_keys=[tourist_id])
     guide = db.relationship('User', foreign_keys=[guide_id])
+
+# === BACKGROUND JOB MODEL ===
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, running, done, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=5, nullable=False)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Workers poll for due pending jobs
+    __table_args__ = (db.Index('ix_jobs_status_run_at', 'status', 'run_at'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'payload': self.payload,
+            'status': self.status,
+            'attempts': self.attempts,
+            'run_at': self.run_at.isoformat(),
+            'last_error': self.last_error
+        }
+
+# === CHANGE FEED (OUTBOX) MODELS ===
+class OutboxEvent(db.Model):
+    """One row per Profile/Swipe/Match change, written in the same transaction (see outbox.py)"""
+    __tablename__ = 'outbox_events'
+    
+    id = db.Column(db.Integer, primary_key=True)  # Feed offset - consumers read id > checkpoint
+    event_type = db.Column(db.String(50), nullable=False)  # profile.created, profile.updated, swipe.created, match.created
+    aggregate_id = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'offset': self.id,
+            'type': self.event_type,
+            'aggregate_id': self.aggregate_id,
+            'payload': self.payload,
+            'created_at': self.created_at.isoformat()
+        }
+
+class ConsumerOffset(db.Model):
+    """Last outbox offset a named consumer has fully processed"""
+    __tablename__ = 'consumer_offsets'
+    
+    consumer = db.Column(db.String(100), primary_key=True)
+    position = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class UserStats(db.Model):
+    """Per-user swipe/match counters maintained from the change feed (counters.py)"""
+    __tablename__ = 'user_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    swipes_sent = db.Column(db.Integer, default=0, nullable=False)
+    likes_received = db.Column(db.Integer, default=0, nullable=False)
+    matches = db.Column(db.Integer, default=0, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'swipes_sent': self.swipes_sent,
+            'likes_received': self.likes_received,
+            'matches': self.matches
+        }
+
+# === CHANGE FEED PUBLISHING ===
+# Outbox rows go out on the flushing connection, so they commit or roll back with the change (consumers: outbox.py)
+def _profile_changes(profile):
+    state = inspect(profile)
+    return sorted(
+        attr.key for attr in state.mapper.column_attrs
+        if state.attrs[attr.key].history.has_changes()
+    )
+
+def _collect_events(session):
+    now = datetime.utcnow()
+    rows = []
+
+    for obj in session.new:
+        if isinstance(obj, Profile):
+            rows.append(('profile.created', obj.user_id, {'user_id': obj.user_id}))
+        elif isinstance(obj, Swipe):
+            rows.append(('swipe.created', obj.id, {
+                'swiper_id': obj.swiper_id,
+                'swiped_id': obj.swiped_id,
+                'direction': obj.direction.value
+            }))
+        elif isinstance(obj, Match):
+            rows.append(('match.created', obj.id, {'user1_id': obj.user1_id, 'user2_id': obj.user2_id}))
+
+    for obj in session.dirty:
+        if isinstance(obj, Profile):
+            fields = _profile_changes(obj)
+            if fields:
+                rows.append(('profile.updated', obj.user_id, {'user_id': obj.user_id, 'fields': fields}))
+
+    return [
+        {'event_type': event_type, 'aggregate_id': aggregate_id, 'payload': payload, 'created_at': now}
+        for event_type, aggregate_id, payload in rows
+    ]
+
+@event.listens_for(OrmSession, 'after_flush')
+def _publish_changes(session, flush_context):
+    # new/dirty and attribute history still describe this flush; ids are assigned
+    rows = _collect_events(session)
+    if rows:
+        session.connection().execute(insert(OutboxEvent.__table__), rows)
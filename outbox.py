@@ -0,0 +1,189 @@
+"""Consumers for the Profile/Swipe/Match change feed (transactional outbox).
+
+Every flush that inserts a Profile, Swipe or Match, or changes a Profile
+column, also inserts an `outbox_events` row on the same connection (hook in
+models.py) - the event exists if and only if the change commits. Consumers
+tail the feed in id order and keep their position in `consumer_offsets`; a
+batch's derived writes and its checkpoint commit together, so a crash
+replays the batch instead of skipping it. Consumers are registered on the
+app by init_outbox(), called from create_app():
+
+    register_consumer(app, 'user_stats', apply_user_stats, reset=reset_user_stats)
+
+    python outbox.py status
+    python outbox.py run [consumer]       # or enqueue('run_outbox_consumers')
+    python outbox.py replay <consumer>    # reset() derived data, re-read from offset 0
+
+Events carry ids and changed field names, not values - consumers re-read
+the row when they need current state. Only ORM flushes publish: the Core
+UPDATEs of the presence last_active flush and of
+reconcile_rating_aggregates() (one correlated statement) are not in the
+feed, while ORM writes such as review aggregates and photo switches are.
+Ordering relies on writers being serialized (SQLite); on a database with
+concurrent writers a lower id can commit after a higher one.
+"""
+from flask import current_app
+from datetime import datetime
+from models import db, OutboxEvent, ConsumerOffset
+from counters import apply_user_stats, reset_user_stats
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# === REGISTRY ===
+def init_outbox(app):
+    """Register the app's feed consumers - add new ones here"""
+    register_consumer(app, 'user_stats', apply_user_stats, reset=reset_user_stats)
+
+
+def register_consumer(app, name, handler, reset=None):
+    """Register handler(events) as a named feed consumer of `app`.
+
+    reset() must delete the consumer's derived data - replay() calls it
+    before re-reading the feed from the start.
+    """
+    app.extensions.setdefault('outbox_consumers', {})[name] = {'handler': handler, 'reset': reset}
+
+
+def registered_consumers():
+    return current_app.extensions.get('outbox_consumers', {})
+
+
+def _get_consumer(name):
+    consumers = registered_consumers()
+    if name not in consumers:
+        raise LookupError(f"Unknown consumer: {name} (registered: {', '.join(sorted(consumers)) or 'none'})")
+    return consumers[name]
+
+
+# === CONSUMING ===
+
+
+def get_position(name):
+    position = db.session.query(ConsumerOffset.position).filter_by(consumer=name).scalar()
+    return position or 0
+
+
+def read_events(name, limit=100, after=None):
+    """Next events for a consumer, oldest first (after its checkpoint unless `after` is given)"""
+    position = get_position(name) if after is None else after
+    return OutboxEvent.query.filter(OutboxEvent.id > position)\
+                            .order_by(OutboxEvent.id).limit(limit).all()
+
+
+def ack(name, position, expected=None):
+    """Move a consumer's checkpoint to `position` (not committed).
+
+    With `expected`, only moves it if nobody else did meanwhile - returns
+    False when another worker got there first.
+    """
+    if expected is None:
+        offset = ConsumerOffset.query.get(name) or ConsumerOffset(consumer=name)
+        offset.position = position
+        db.session.add(offset)
+        return True
+
+    if not ConsumerOffset.query.get(name):
+        db.session.add(ConsumerOffset(consumer=name, position=0))
+        db.session.flush()
+
+    moved = ConsumerOffset.query.filter_by(consumer=name, position=expected)\
+                                .update({'position': position, 'updated_at': datetime.utcnow()},
+                                        synchronize_session=False)
+    return bool(moved)
+
+
+def run_consumer(name, batch_size=500, max_batches=None):
+    """Feed pending events to a registered consumer until caught up. Returns events processed."""
+    handler = _get_consumer(name)['handler']
+    processed = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        position = get_position(name)
+        events = read_events(name, batch_size, after=position)
+        if not events:
+            break
+
+        try:
+            handler(events)
+            # Conditional checkpoint - a concurrent run of the same consumer loses, not duplicates
+            if not ack(name, events[-1].id, expected=position):
+                db.session.rollback()
+                logger.info("Consumer %s advanced elsewhere, stopping", name)
+                break
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        processed += len(events)
+        batches += 1
+
+    return processed
+
+
+def run_consumers(batch_size=500):
+    """Run every registered consumer once, return {name: events processed}"""
+    results = {}
+    for name in registered_consumers():
+        try:
+            results[name] = run_consumer(name, batch_size)
+        except Exception:
+            logger.exception("Outbox consumer %s failed", name)
+            results[name] = None
+    return results
+
+
+def replay(name, batch_size=500):
+    """Rebuild a consumer's derived data from scratch: reset(), checkpoint to 0, re-read everything"""
+    reset = _get_consumer(name)['reset']
+    if reset:
+        reset()
+    ack(name, 0)
+    db.session.commit()
+    return run_consumer(name, batch_size)
+
+
+def feed_status():
+    head = db.session.query(db.func.max(OutboxEvent.id)).scalar() or 0
+    positions = dict(db.session.query(ConsumerOffset.consumer, ConsumerOffset.position))
+    return {
+        'head': head,
+        'consumers': {
+            name: {'position': positions.get(name, 0), 'lag': head - positions.get(name, 0)}
+            for name in sorted(set(registered_consumers()) | set(positions))
+        }
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description='Change feed consumers')
+    parser.add_argument('command', choices=['status', 'run', 'replay'])
+    parser.add_argument('consumer', nargs='?')
+    parser.add_argument('--batch-size', type=int)
+    args = parser.parse_args()
+
+    app = create_app()
+    batch_size = args.batch_size or app.config['OUTBOX_BATCH_SIZE']
+    with app.app_context():
+        consumers = registered_consumers()
+        if args.consumer and args.consumer not in consumers:
+            parser.error(f"unknown consumer {args.consumer!r}, choose from: {', '.join(sorted(consumers))}")
+        if args.command == 'status':
+            status = feed_status()
+            print(f"Feed head: {status['head']}")
+            for name, info in status['consumers'].items():
+                print(f"  {name}: position {info['position']} (lag {info['lag']})")
+        elif args.command == 'run':
+            names = [args.consumer] if args.consumer else list(consumers)
+            for name in names:
+                print(f"{name}: {run_consumer(name, batch_size)} events")
+        else:
+            if not args.consumer:
+                parser.error('replay needs a consumer name')
+            print(f"{args.consumer}: replayed {replay(args.consumer, batch_size)} events")
@@ -0,0 +1,114 @@
+"""Write-behind presence tracking for Profile.last_active.
+
+Every authenticated request records "user X seen now" in memory only. A
+background thread flushes the coalesced timestamps in one bulk UPDATE every
+PRESENCE_FLUSH_INTERVAL seconds, so a user making 50 requests costs one
+row write per interval instead of 50.
+"""
+from flask import request, session
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, update
+from models import db, Profile
+import atexit
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceTracker:
+    def __init__(self):
+        self.app = None
+        self._seen = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['presence'] = self
+
+        @app.before_request
+        def record_presence():
+            # Reading the session adds Vary: Cookie - keep it off cacheable static assets
+            if request.endpoint == 'static':
+                return
+            # Session cookie only - no user lookup, no DB write
+            user_id = session.get('_user_id')
+            if user_id:
+                self.touch(int(user_id))
+
+        atexit.register(self.flush)
+
+    def touch(self, user_id, when=None):
+        with self._lock:
+            self._seen[user_id] = when or datetime.utcnow()
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        # Started lazily in each process - a thread started before gunicorn forks would not survive
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='presence-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        interval = self.app.config['PRESENCE_FLUSH_INTERVAL']
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Presence flush failed")
+
+    def flush(self):
+        """Write pending timestamps in one executemany UPDATE, return rows written"""
+        with self._lock:
+            pending, self._seen = self._seen, {}
+        if not pending or self.app is None:
+            return 0
+
+        statement = update(Profile.__table__).where(
+            Profile.__table__.c.user_id == bindparam('uid'),
+            db.or_(
+                Profile.__table__.c.last_active.is_(None),
+                Profile.__table__.c.last_active < bindparam('seen')
+            )
+        ).values(
+            last_active=bindparam('seen'),
+            updated_at=Profile.__table__.c.updated_at  # Pin it - being seen is not a profile edit (skips onupdate)
+        )
+
+        try:
+            with self.app.app_context():
+                db.session.execute(statement, [
+                    {'uid': user_id, 'seen': seen} for user_id, seen in pending.items()
+                ])
+                db.session.commit()
+        except Exception:
+            # Put them back for the next flush, keeping anything newer seen meanwhile
+            with self._lock:
+                for user_id, seen in pending.items():
+                    if self._seen.get(user_id, seen) <= seen:
+                        self._seen[user_id] = seen
+            raise
+        return len(pending)
+
+
+def active_since(app, mode):
+    """Cutoff datetime for the deck's `active` filter ('online' or 'recent')"""
+    now = datetime.utcnow()
+    if mode == 'online':
+        return now - timedelta(minutes=app.config['PRESENCE_ONLINE_MINUTES'])
+    if mode == 'recent':
+        return now - timedelta(hours=app.config['PRESENCE_RECENT_HOURS'])
+    raise ValueError("active must be 'online' or 'recent'")
+
+
+presence = PresenceTracker()
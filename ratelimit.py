@@ -0,0 +1,134 @@
+"""Token-bucket rate limiting for API routes.
+
+    @api.route('/swipe', methods=['POST'])
+    @limiter.limit('60/minute', scope='user')
+    @login_required
+    def swipe_profile(): ...
+
+Place the decorator above @login_required: it runs before the user is
+loaded, so throttled requests never touch the database. Per-user keys come
+straight from the Flask-Login session cookie.
+
+Limits can be overridden per route in config:
+
+    RATELIMITS = {'api.swipe_profile:user': '120/minute'}
+"""
+from abc import ABC, abstractmethod
+from flask import current_app, jsonify, request, session
+from collections import OrderedDict
+from functools import wraps
+import math
+import threading
+import time
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limit(spec):
+    """'60/minute' -> (60, 60.0) i.e. (capacity, period in seconds)"""
+    count, period = spec.split('/')
+    return int(count), float(PERIODS[period.strip().rstrip('s')])
+
+
+# === STORES ===
+class RateLimitStore(ABC):
+    """Shared-store interface (e.g. Redis). Must apply consume() atomically per key."""
+
+    @abstractmethod
+    def consume(self, key, capacity, period, now):
+        """Take one token. Return (allowed, retry_after_seconds)."""
+
+
+class MemoryStore(RateLimitStore):
+    """Per-process buckets - limits are per gunicorn worker.
+
+    Buckets are kept in recency order, so cleanup only ever looks at the
+    oldest entries: O(1) per request no matter how many keys a burst of
+    distinct IPs creates, and never more than max_keys buckets.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated, period), least recently used first
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, period, now):
+        refill_rate = capacity / period  # tokens per second
+
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, period))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now, period)
+                allowed, retry_after = True, 0
+            else:
+                self._buckets[key] = (tokens, now, period)
+                allowed, retry_after = False, (1 - tokens) / refill_rate
+            self._buckets.move_to_end(key)
+
+            self._evict(now)
+
+        return allowed, retry_after
+
+    def _evict(self, now):
+        # Buckets idle for a whole period are full again and carry no state
+        while self._buckets:
+            _, updated, period = next(iter(self._buckets.values()))
+            if now - updated <= period:
+                break
+            self._buckets.popitem(last=False)
+
+        # Hard cap - drop the least recently used
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+
+# === LIMITER ===
+class RateLimiter:
+    def __init__(self, app=None):
+        self.store = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_ENABLED', True)
+        app.config.setdefault('RATELIMITS', {})
+        self.store = app.config.get('RATELIMIT_STORE') or MemoryStore()
+        app.extensions['ratelimiter'] = self
+
+    def _key(self, scope):
+        if scope == 'user':
+            # Cookie-backed session - no DB lookup
+            user_id = session.get('_user_id')
+            if user_id:
+                return f'user:{user_id}'
+        return f'ip:{request.remote_addr}'
+
+    def limit(self, spec, scope='ip', methods=None):
+        """Decorate a view with a token bucket keyed per user or per IP"""
+        def decorator(view):
+            @wraps(view)
+            def wrapped(*args, **kwargs):
+                config = current_app.config
+                if not config['RATELIMIT_ENABLED'] or (methods and request.method not in methods):
+                    return view(*args, **kwargs)
+
+                override = config['RATELIMITS'].get(f'{request.endpoint}:{scope}', spec)
+                capacity, period = parse_limit(override)
+                key = f'{request.endpoint}:{scope}:{self._key(scope)}'
+
+                # Wall clock, not monotonic - shared stores compare timestamps across processes
+                allowed, retry_after = self.store.consume(key, capacity, period, time.time())
+                if not allowed:
+                    response = jsonify({'error': 'Too many requests, slow down'})
+                    response.status_code = 429
+                    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                    return response
+
+                return view(*args, **kwargs)
+            return wrapped
+        return decorator
+
+
+limiter = RateLimiter()
@@ -0,0 +1,107 @@
+"""Offline collaborative-filtering recommendations from swipe history.
+
+Builds a sparse user x guide matrix from Swipe rows (RIGHT = +1, UP = +2,
+LEFT = -1), computes item-item cosine similarity between guides from the
+positive signal, scores every unseen guide for every user and stores the
+top K in `recommendations`. /api/profiles then serves the personalized deck
+with one indexed read.
+
+    python recommendations.py        # or enqueue('build_recommendations')
+"""
+from datetime import datetime
+from models import db, Profile, ProfileType, Recommendation, Swipe, SwipeDirection
+import numpy as np
+import scipy.sparse as sp
+
+SIGNAL = {SwipeDirection.RIGHT: 1.0, SwipeDirection.UP: 2.0, SwipeDirection.LEFT: -1.0}
+
+
+def load_interactions():
+    """Sparse (users x guides) matrix plus the id <-> index lookups"""
+    guide_ids = [row[0] for row in db.session.query(Profile.user_id).filter(
+        Profile.profile_type.in_([ProfileType.GUIDE, ProfileType.BOTH])
+    ).order_by(Profile.user_id)]
+    guide_index = {guide_id: i for i, guide_id in enumerate(guide_ids)}
+
+    user_index, rows, cols, values = {}, [], [], []
+    swipes = db.session.query(Swipe.swiper_id, Swipe.swiped_id, Swipe.direction)\
+                       .execution_options(yield_per=10000)
+    for swiper_id, swiped_id, direction in swipes:
+        col = guide_index.get(swiped_id)
+        if col is None:
+            continue  # Swipes on non-guides carry no deck signal
+        rows.append(user_index.setdefault(swiper_id, len(user_index)))
+        cols.append(col)
+        values.append(SIGNAL[direction])
+
+    matrix = sp.csr_matrix(
+        (np.array(values, dtype=np.float32), (rows, cols)),
+        shape=(len(user_index), len(guide_ids))
+    )
+    user_ids = np.empty(len(user_index), dtype=np.int64)
+    for user_id, i in user_index.items():
+        user_ids[i] = user_id
+
+    return matrix, user_ids, np.array(guide_ids, dtype=np.int64)
+
+
+def guide_similarity(matrix):
+    """Item-item cosine similarity over positive swipes, diagonal zeroed"""
+    positive = matrix.maximum(0).tocsc()
+    norms = np.sqrt(np.asarray(positive.multiply(positive).sum(axis=0))).ravel()
+    norms[norms == 0] = 1.0
+    normalized = positive @ sp.diags(1.0 / norms)
+
+    similarity = (normalized.T @ normalized).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+    return similarity
+
+
+def build_recommendations(top_k=50, batch_size=1000):
+    """Recompute and store top-K recommendations for every user who swiped. Returns users written."""
+    matrix, user_ids, guide_ids = load_interactions()
+    if matrix.nnz == 0:
+        return 0
+
+    similarity = guide_similarity(matrix)
+    k = min(top_k, len(guide_ids))
+    now = datetime.utcnow()
+    written = 0
+
+    # Score users in batches so the dense score block stays bounded
+    for start in range(0, matrix.shape[0], batch_size):
+        batch = matrix[start:start + batch_size]
+        scores = (batch @ similarity).toarray()
+        scores[batch.toarray() != 0] = -np.inf  # Never recommend an already swiped guide
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        batch_user_ids = user_ids[start:start + batch_size]
+        rows = []
+        for i, user_id in enumerate(batch_user_ids):
+            ranked = top[i][np.argsort(-scores[i, top[i]])]
+            ranked = [col for col in ranked if scores[i, col] > 0]
+            rows.extend({
+                'user_id': int(user_id),
+                'guide_id': int(guide_ids[col]),
+                'rank': rank,
+                'score': float(scores[i, col]),
+                'created_at': now
+            } for rank, col in enumerate(ranked))
+
+        Recommendation.query.filter(Recommendation.user_id.in_(batch_user_ids.tolist()))\
+                            .delete(synchronize_session=False)
+        db.session.bulk_insert_mappings(Recommendation, rows)
+        db.session.commit()
+        written += len(batch_user_ids)
+
+    return written
+
+
+if __name__ == '__main__':
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        users = build_recommendations(app.config['RECOMMENDATIONS_TOP_K'])
+        print(f"Recommendations built for {users} users")
@@ -0,0 +1,96 @@
+"""Read-replica routing for read-heavy GET endpoints.
+
+Set REPLICA_DATABASE_URL to enable. Views decorated with @replica_read run
+their SELECTs against the replica bind, except for a client that wrote
+something in the last REPLICA_STICKY_SECONDS - it keeps reading from the
+primary so it always sees its own writes.
+
+Locally, two SQLite files work as primary/replica:
+
+    REPLICA_DATABASE_URL=sqlite:///guideswipe_replica.db python app.py
+    python replica.py sync       # copy primary -> replica once
+    python replica.py watch 2    # ... or keep syncing every 2 seconds
+"""
+from flask import g, has_request_context, session
+from functools import wraps
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db
+import sys
+import time
+
+STICKY_KEY = '_primary_until'
+
+
+def replica_enabled():
+    return 'replica' in db.engines
+
+
+def replica_read(view):
+    """Route this view's reads to the replica unless the client just wrote"""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if replica_enabled() and session.get(STICKY_KEY, 0) < time.time():
+            db.session.info['use_replica'] = True
+        return view(*args, **kwargs)
+    return wrapped
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_write_after_flush(db_session, flush_context):
+    if has_request_context():
+        g.db_wrote = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_bulk_write(orm_execute_state):
+    if has_request_context() and (orm_execute_state.is_update or orm_execute_state.is_delete):
+        g.db_wrote = True
+
+
+def init_replica(app):
+    @app.after_request
+    def stick_to_primary_after_write(response):
+        # Read-your-writes: the cookie session carries the deadline across workers
+        if g.get('db_wrote') and 'replica' in app.config.get('SQLALCHEMY_BINDS', {}):
+            session[STICKY_KEY] = time.time() + app.config['REPLICA_STICKY_SECONDS']
+        return response
+
+
+def sync_replica():
+    """Copy the primary into the replica (SQLite only - a stand-in for real replication)"""
+    primary, replica = db.engines[None], db.engines['replica']
+    if primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+        raise RuntimeError("sync_replica only supports SQLite - use the database's own replication")
+
+    source = primary.raw_connection()
+    target = replica.raw_connection()
+    try:
+        source.driver_connection.backup(target.driver_connection)
+    finally:
+        target.close()
+        source.close()
+
+
+if __name__ == '__main__':
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        if not replica_enabled():
+            print("Set REPLICA_DATABASE_URL first")
+            sys.exit(1)
+
+        command = sys.argv[1] if len(sys.argv) > 1 else 'sync'
+        if command == 'sync':
+            sync_replica()
+            print("Replica synced")
+        elif command == 'watch':
+            interval = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+            print(f"Syncing replica every {interval}s (Ctrl+C to stop)")
+            while True:
+                sync_replica()
+                time.sleep(interval)
+        else:
+            print("Usage: python replica.py [sync|watch [seconds]]")
+            sys.exit(1)
@@ -1,15 +1,115 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, jsonify, session, current_app, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, load_only
+from sqlalchemy.orm.attributes import set_committed_value
 from werkzeug.security import generate_password_hash, check_password_hash
-from models import db, User, Profile, Swipe, Match, Message, PointTransaction, SwipeDirection
-from utils import get_nearby_profiles, create_match_if_mutual, generate_mock_profiles
+from models import db, User, Profile, Swipe, Match, Message, MessageArchive, Recommendation, Review, PointTransaction, OutboxEvent, ConsumerOffset, UserStats, ProfileType, SwipeDirection
+from utils import get_nearby_profiles, create_match_if_mutual, generate_mock_profiles, validate_image_upload, add_review, parse_fields, get_user_statistics, set_profile_photo
+from images import save_upload_stream, verify_image, thumbnails_exist, InvalidImage, UploadTooLarge
+from snapshots import snapshot_exists, restore_snapshot
+from jobs import enqueue
+from ratelimit import limiter
+from replica import replica_read
+from archive import get_message_history, has_archived_messages
+from presence import active_since
+from export import EXPORTS, CONTENT_TYPES, generate_export, parse_since
+from outbox import read_events, ack, feed_status
+from functools import wraps
+import os
 import random
 
 # Create blueprint
 api = Blueprint('api', __name__, url_prefix='/api')
 
+# === PAYLOAD BUILDERS ===
+# Shared by the JSON API and the server-rendered pages (embedded bootstrap data)
+def build_profiles_payload(user, limit=10, exclude_swiped=True, fields=None, active_since=None, personalized=True):
+    # Get already swiped profile IDs
+    swiped_ids = []
+    if exclude_swiped:
+        swiped_profiles = db.session.query(Swipe.swiped_id).filter_by(
+            swiper_id=user.id
+        ).all()
+        swiped_ids = [s[0] for s in swiped_profiles]
+    
+    # Query for profiles
+    query = db.session.query(Profile).join(User).filter(
+        User.id != user.id,  # Exclude self
+        User.is_active == True,
+        Profile.profile_type.in_([ProfileType.GUIDE, ProfileType.BOTH])  # Only guides
+    )
+    
+    if swiped_ids:
+        query = query.filter(~Profile.user_id.in_(swiped_ids))
+    
+    # "Online now" / "active recently" - indexed range on last_active
+    if active_since:
+        query = query.filter(Profile.last_active >= active_since)
+    
+    if fields:
+        # Skip bio/JSON columns the caller didn't ask for
+        query = query.options(load_only(*Profile.load_only_columns(fields)))
+    
+    # Personalized picks first - precomputed offline by recommendations.py
+    profiles = []
+    if personalized:
+        profiles = query.join(Recommendation, db.and_(
+            Recommendation.user_id == user.id,
+            Recommendation.guide_id == Profile.user_id
+        )).order_by(Recommendation.rank).limit(limit).all()
+    
+    # Top up with best-rated - Bayesian score so a single 5-star review doesn't top the deck
+    if len(profiles) < limit:
+        if profiles:
+            query = query.filter(~Profile.id.in_([p.id for p in profiles]))
+        profiles += query.order_by(Profile.weighted_rating.desc()).limit(limit - len(profiles)).all()
+    
+    # If no real profiles, generate mock data for demo (not for an explicit activity filter)
+    if not profiles and not active_since:
+        profiles = generate_mock_profiles(limit)
+    
+    return {
+        'profiles': [p.to_dict(fields) for p in profiles],
+        'count': len(profiles)
+    }
+
+def build_matches_payload(user, fields=None):
+    query = Match.query.filter(
+        db.or_(Match.user1_id == user.id, Match.user2_id == user.id),
+        Match.is_active == True
+    )
+    
+    if fields:
+        columns = Profile.load_only_columns(fields)
+        query = query.options(
+            joinedload(Match.user1).joinedload(User.profile).load_only(*columns),
+            joinedload(Match.user2).joinedload(User.profile).load_only(*columns)
+        )
+    
+    matches = query.order_by(Match.created_at.desc()).all()
+    
+    return {
+        'matches': [m.to_dict(user.id, fields) for m in matches],
+        'count': len(matches)
+    }
+
+def build_points_payload(user):
+    transactions = PointTransaction.query.filter_by(user_id=user.id)\
+                                       .order_by(PointTransaction.created_at.desc())\
+                                       .limit(20).all()
+    
+    return {
+        'balance': user.points_balance,
+        'total_earned': user.total_points_earned,
+        'total_spent': user.total_points_spent,
+        'level': user.get_level(),
+        'recent_transactions': [t.to_dict() for t in transactions]
+    }
+
 # === AUTHENTICATION ROUTES ===
 @api.route('/register', methods=['POST'])
+@limiter.limit('5/minute', scope='ip')
 def register():
     try:
         data = request.get_json()
@@ -53,6 +153,7 @@ def register():
         return jsonify({'error': str(e)}), 500
 
 @api.route('/login', methods=['POST'])
+@limiter.limit('10/minute', scope='ip')
 def login():
     try:
         data = request.get_json()
@@ -80,7 +181,17 @@ def logout():
 @api.route('/me', methods=['GET'])
 @login_required
 def get_current_user():
-    return jsonify({'user': current_user.to_dict()}), 200
+    try:
+        fields = parse_fields(request.args.get('fields'), Profile.FIELD_COLUMNS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if fields:
+        profile = Profile.query.options(load_only(*Profile.load_only_columns(fields)))\
+                               .filter_by(user_id=current_user.id).first()
+        set_committed_value(current_user, 'profile', profile)
+    
+    return jsonify({'user': current_user.to_dict(fields)}), 200
 
 # === PROFILE ROUTES ===
 @api.route('/profile', methods=['GET', 'POST'])
@@ -127,48 +238,87 @@ def handle_profile():
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
 
+MULTIPART_OVERHEAD = 64 * 1024  # Boundaries and part headers on top of the image itself
+
+@api.route('/profile/photo', methods=['POST'])
+@login_required
+def upload_profile_photo():
+    if not current_user.profile:
+        return jsonify({'error': 'Create a profile first'}), 400
+    
+    # Reject before request.files makes Werkzeug parse and spool the whole body
+    max_size = current_app.config['MAX_IMAGE_SIZE']
+    if (request.content_length or 0) > max_size + MULTIPART_OVERHEAD:
+        return jsonify({'error': f"File too large (max {max_size // (1024 * 1024)}MB)"}), 413
+    
+    file = request.files.get('photo')
+    if not file or not file.filename:
+        return jsonify({'error': 'No photo uploaded'}), 400
+    
+    valid, message = validate_image_upload(file)
+    if not valid:
+        return jsonify({'error': message}), 400
+    
+    try:
+        upload_dir = os.path.join(current_app.root_path, current_app.config['UPLOAD_FOLDER'])
+        sizes = current_app.config['THUMBNAIL_SIZES']
+        
+        digest, filename = save_upload_stream(file, upload_dir, max_size)
+        verify_image(os.path.join(upload_dir, filename))
+        
+        # Same image uploaded before - its variants are already on disk
+        if thumbnails_exist(upload_dir, digest, sizes):
+            variants = set_profile_photo(current_user.id, digest, sizes)
+            db.session.commit()
+            return jsonify({
+                'message': 'Photo uploaded successfully',
+                'photo_url': variants['card'],
+                'variants': variants
+            }), 201
+        
+        # Resizing runs in the process pool via a job - the profile switches once the variants exist
+        enqueue('apply_profile_photo', user_id=current_user.id, filename=filename)
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Photo uploaded, processing',
+            'status': 'processing'
+        }), 202
+        
+    except InvalidImage as e:
+        return jsonify({'error': str(e)}), 400
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # === SWIPE/DISCOVERY ROUTES ===
 @api.route('/profiles', methods=['GET'])
+@replica_read
 @login_required
 def get_profiles():
     try:
         # Get query parameters
         limit = request.args.get('limit', 10, type=int)
         exclude_swiped = request.args.get('exclude_swiped', 'true').lower() == 'true'
+        fields = parse_fields(request.args.get('fields'), Profile.FIELD_COLUMNS)
+        active = request.args.get('active')
+        since = active_since(current_app, active) if active else None
+        personalized = request.args.get('personalized', 'true').lower() == 'true'
         
-        # Get already swiped profile IDs
-        swiped_ids = []
-        if exclude_swiped:
-            swiped_profiles = db.session.query(Swipe.swiped_id).filter_by(
-                swiper_id=current_user.id
-            ).all()
-            swiped_ids = [s[0] for s in swiped_profiles]
-        
-        # Query for profiles
-        query = db.session.query(Profile).join(User).filter(
-            User.id != current_user.id,  # Exclude self
-            User.is_active == True,
-            Profile.profile_type.in_(['guide', 'both'])  # Only guides
-        )
-        
-        if swiped_ids:
-            query = query.filter(~Profile.user_id.in_(swiped_ids))
-        
-        profiles = query.limit(limit).all()
-        
-        # If no real profiles, generate mock data for demo
-        if not profiles:
-            profiles = generate_mock_profiles(limit)
-        
-        return jsonify({
-            'profiles': [p.to_dict() for p in profiles],
-            'count': len(profiles)
-        }), 200
+        return jsonify(build_profiles_payload(
+            current_user, limit, exclude_swiped, fields, since, personalized
+        )), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @api.route('/swipe', methods=['POST'])
+@limiter.limit('300/minute', scope='ip')
+@limiter.limit('60/minute', scope='user')
 @login_required
 def swipe_profile():
     try:
@@ -201,6 +351,11 @@ def swipe_profile():
         if swipe.is_like():
             match = create_match_if_mutual(current_user.id, profile_id)
             if match:
+                db.session.flush()  # Assign match.id
+                
+                # Runs after commit, off the request path
+                enqueue('send_welcome_message', match_id=match.id)
+                
                 # Get matched user's profile
                 matched_user = User.query.get(profile_id)
                 match_data = {
@@ -226,26 +381,74 @@ def swipe_profile():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-# === MATCH ROUTES ===
-@api.route('/matches', methods=['GET'])
+# === REVIEW ROUTES ===
+@api.route('/reviews', methods=['POST'])
+@limiter.limit('10/minute', scope='user')
 @login_required
-def get_matches():
+def create_review():
+    try:
+        data = request.get_json()
+        guide_id = data.get('guide_id')
+        rating = data.get('rating')
+        
+        if type(guide_id) is not int or type(rating) is not int or not 1 <= rating <= 5:
+            return jsonify({'error': 'guide_id (integer) and rating (1-5) are required'}), 400
+        
+        if guide_id == current_user.id:
+            return jsonify({'error': 'You cannot review yourself'}), 400
+        
+        review = add_review(current_user.id, guide_id, rating, data.get('comment'))
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Review added successfully',
+            'review': review.to_dict()
+        }), 201
+        
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()  # Lost the race against a concurrent review by the same user
+        return jsonify({'error': 'You have already reviewed this guide'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/profiles/<int:user_id>/reviews', methods=['GET'])
+@login_required
+def get_reviews(user_id):
     try:
-        matches = Match.query.filter(
-            db.or_(Match.user1_id == current_user.id, Match.user2_id == current_user.id),
-            Match.is_active == True
-        ).order_by(Match.created_at.desc()).all()
+        limit = request.args.get('limit', 20, type=int)
+        reviews = Review.query.filter_by(guide_id=user_id)\
+                              .order_by(Review.created_at.desc())\
+                              .limit(limit).all()
         
         return jsonify({
-            'matches': [m.to_dict(current_user.id) for m in matches],
-            'count': len(matches)
+            'reviews': [r.to_dict() for r in reviews],
+            'count': len(reviews)
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# === MATCH ROUTES ===
+@api.route('/matches', methods=['GET'])
+@replica_read
+@login_required
+def get_matches():
+    try:
+        fields = parse_fields(request.args.get('fields'), Profile.FIELD_COLUMNS)
+        return jsonify(build_matches_payload(current_user, fields)), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # === CHAT ROUTES ===
 @api.route('/matches/<int:match_id>/messages', methods=['GET', 'POST'])
+@limiter.limit('30/minute', scope='user', methods=['POST'])
 @login_required
 def handle_messages(match_id):
     # Verify user is part of this match
@@ -254,6 +457,13 @@ def handle_messages(match_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     if request.method == 'GET':
+        # Scrolling back - older page from the hot table and then the archive
+        before_id = request.args.get('before', type=int)
+        if before_id:
+            limit = min(request.args.get('limit', 50, type=int), 200)
+            messages, has_more = get_message_history(match_id, before_id, limit)
+            return jsonify({'messages': messages, 'has_more': has_more}), 200
+        
         messages = Message.query.filter_by(match_id=match_id)\
                                 .order_by(Message.created_at.asc()).all()
         
@@ -264,7 +474,8 @@ def handle_messages(match_id):
         db.session.commit()
         
         return jsonify({
-            'messages': [m.to_dict() for m in messages]
+            'messages': [m.to_dict() for m in messages],
+            'has_more': has_archived_messages(match_id)
         }), 200
     
     elif request.method == 'POST':
@@ -293,36 +504,123 @@ def handle_messages(match_id):
 
 # === POINTS ROUTES ===
 @api.route('/user/points', methods=['GET'])
+@replica_read
 @login_required
 def get_user_points():
     try:
-        transactions = PointTransaction.query.filter_by(user_id=current_user.id)\
-                                           .order_by(PointTransaction.created_at.desc())\
-                                           .limit(20).all()
+        return jsonify(build_points_payload(current_user)), 200
         
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/user/stats', methods=['GET'])
+@replica_read
+@login_required
+def get_user_stats():
+    try:
+        return jsonify({'stats': get_user_statistics(current_user.id)}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# === ADMIN EXPORT ROUTES ===
+def admin_required(view):
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if current_user.email not in current_app.config['ADMIN_EMAILS']:
+            return jsonify({'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapped
+
+@api.route('/admin/export/<table>', methods=['GET'])
+@replica_read
+@admin_required
+def export_table(table):
+    """Stream a table as NDJSON/CSV (chunked) - ?format=csv&since_id=123 or &since=<iso>"""
+    if table not in EXPORTS:
+        return jsonify({'error': f"Unknown table, choose from: {', '.join(sorted(EXPORTS))}"}), 404
+    
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in CONTENT_TYPES:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    since_id = request.args.get('since_id', type=int)
+    try:
+        since = parse_since(request.args['since']) if request.args.get('since') else None
+    except ValueError:
+        return jsonify({'error': 'since must be an ISO timestamp'}), 400
+    
+    return Response(
+        stream_with_context(generate_export(table, fmt, since_id, since)),
+        mimetype=CONTENT_TYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename={table}.{fmt}'}
+    )
+
+@api.route('/admin/events', methods=['GET'])
+@admin_required
+def get_events():
+    """Tail the change feed - ?consumer=name resumes from its checkpoint, or ?after=<offset>"""
+    consumer = request.args.get('consumer')
+    after = request.args.get('after', type=int)
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    if consumer is None and after is None:
+        return jsonify({'error': 'consumer or after is required'}), 400
+    
+    try:
+        events = read_events(consumer, limit, after=after)
         return jsonify({
-            'balance': current_user.points_balance,
-            'total_earned': current_user.total_points_earned,
-            'total_spent': current_user.total_points_spent,
-            'level': current_user.get_level(),
-            'recent_transactions': [t.to_dict() for t in transactions]
+            'events': [e.to_dict() for e in events],
+            'next_offset': events[-1].id if events else after
         }), 200
-        
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api.route('/admin/events/ack', methods=['POST'])
+@admin_required
+def ack_events():
+    """Checkpoint a consumer after it has processed everything up to `offset`"""
+    data = request.get_json() or {}
+    if not data.get('consumer') or not isinstance(data.get('offset'), int):
+        return jsonify({'error': 'consumer and integer offset are required'}), 400
+    
+    try:
+        ack(data['consumer'], data['offset'])
+        db.session.commit()
+        return jsonify({'consumer': data['consumer'], 'offset': data['offset']}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/admin/events/status', methods=['GET'])
+@admin_required
+def events_status():
+    """Feed head and each consumer's position/lag"""
+    return jsonify(feed_status()), 200
+
 # === DEMO/UTILITY ROUTES ===
 @api.route('/demo/reset', methods=['POST'])
 def reset_demo_data():
     """Reset demo data - only for development"""
     try:
-        # Clear all data
+        # Roll back to the seeded snapshot when there is one (milliseconds)
+        if snapshot_exists():
+            restore_snapshot()
+            return jsonify({'message': 'Demo data restored from snapshot'}), 200
+        
+        # Otherwise clear all data
         db.session.query(Message).delete()
+        db.session.query(MessageArchive).delete()
         db.session.query(Match).delete()
         db.session.query(Swipe).delete()
+        db.session.query(Recommendation).delete()
         db.session.query(PointTransaction).delete()
+        db.session.query(Review).delete()
+        db.session.query(UserStats).delete()
         db.session.query(Profile).delete()
         db.session.query(User).delete()
+        db.session.query(OutboxEvent).delete()
+        db.session.query(ConsumerOffset).delete()  # Consumers start over on the empty feed
         
         db.session.commit()
         
@@ -1,8 +1,21 @@
 from app import create_app, db
-from models import User, Profile, ProfileType
+from snapshots import create_snapshot
+from models import User, Profile, Review, ProfileType
 from werkzeug.security import generate_password_hash
 import random
 
+def demo_ratings(average, count):
+    """Star ratings (1-5) whose mean is as close to `average` as possible"""
+    ratings = [5] * count
+    deficit = 5 * count - round(average * count)
+    i = 0
+    while deficit > 0:
+        if ratings[i % count] > 1:
+            ratings[i % count] -= 1
+            deficit -= 1
+        i += 1
+    return ratings
+
 def create_demo_users():
     """Create demo users and profiles"""
     
@@ -85,6 +98,7 @@ def create_demo_users():
         }
     ]
     
+    guide_profiles = []
     for guide_data in guides_data:
         user = User(
             email=guide_data["email"],
@@ -102,12 +116,30 @@ def create_demo_users():
             location=guide_data["location"],
             specialties=guide_data["specialties"],
             hourly_rate=guide_data["hourly_rate"],
-            average_rating=guide_data["rating"],
-            total_reviews=random.randint(20, 50),
             profile_type=ProfileType.GUIDE,
             photo_url=guide_data["photo_url"]  # DODANO TĘ LINIĘ
         )
         db.session.add(profile)
+        guide_profiles.append((profile, guide_data["rating"]))
+    
+    # Demo reviewers (after the guides, so guide ids stay 2-6) - one review per (reviewer, guide)
+    reviewer_hash = generate_password_hash("demo123")
+    reviewers = []
+    for i in range(1, 51):
+        reviewer = User(email=f"reviewer{i}@demo.com", password_hash=reviewer_hash)
+        reviewer.profile = Profile(name=f"Turysta {i}", profile_type=ProfileType.TOURIST)
+        reviewers.append(reviewer)
+    db.session.add_all(reviewers)
+    db.session.flush()
+    
+    for profile, average in guide_profiles:
+        # Real review rows so aggregates reconcile against them
+        ratings = demo_ratings(average, random.randint(20, 50))
+        db.session.bulk_insert_mappings(Review, [
+            {'reviewer_id': reviewer.id, 'guide_id': profile.user_id, 'rating': r}
+            for reviewer, r in zip(random.sample(reviewers, len(ratings)), ratings)
+        ])
+        profile.set_rating_aggregates(sum(ratings), len(ratings))
     
     db.session.commit()
     print("Demo users created successfully!")
@@ -118,3 +150,6 @@ if __name__ == "__main__":
         db.drop_all()
         db.create_all()
         create_demo_users()
+        
+        # Reset endpoint and tests restore from this instead of reseeding
+        print(f"Snapshot written to {create_snapshot()}")
@@ -0,0 +1,89 @@
+"""Fast database snapshot/restore using the SQLite online backup API.
+
+    python seed_data.py              # seeds and writes the snapshot
+    python snapshots.py create       # snapshot the current database
+    python snapshots.py restore      # roll the database back to the snapshot
+
+Restoring copies pages straight into the live database, so it takes
+milliseconds instead of re-running the seed inserts. Used by
+/api/demo/reset and by the test fixtures in tests/conftest.py, which seed
+once per session and restore before every test.
+"""
+from flask import current_app
+from models import db
+import os
+import sqlite3
+import sys
+
+
+def snapshot_path():
+    return current_app.config.get('SNAPSHOT_PATH') or \
+        os.path.join(current_app.instance_path, 'seed_snapshot.db')
+
+
+def snapshot_exists():
+    return os.path.exists(snapshot_path())
+
+
+def _live_connection():
+    if db.engine.dialect.name != 'sqlite':
+        raise RuntimeError("Snapshots are only supported for SQLite databases")
+    return db.engine.raw_connection()
+
+
+def create_snapshot(path=None):
+    """Copy the live database into the snapshot file, return its path"""
+    path = path or snapshot_path()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    db.session.commit()  # Make sure pending work is part of the snapshot
+    tmp_path = path + '.tmp'
+    raw = _live_connection()
+    try:
+        target = sqlite3.connect(tmp_path)
+        try:
+            raw.driver_connection.backup(target)
+        finally:
+            target.close()
+    finally:
+        raw.close()
+
+    # Readers never see a half-written snapshot
+    os.replace(tmp_path, path)
+    return path
+
+
+def restore_snapshot(path=None):
+    """Overwrite the live database with the snapshot contents"""
+    path = path or snapshot_path()
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No snapshot at {path} - run `python snapshots.py create`")
+
+    # Drop the session so no stale objects survive the restore
+    db.session.remove()
+
+    raw = _live_connection()
+    try:
+        source = sqlite3.connect(path)
+        try:
+            source.backup(raw.driver_connection)
+        finally:
+            source.close()
+    finally:
+        raw.close()
+
+
+if __name__ == '__main__':
+    from app import create_app
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'create'
+    app = create_app()
+    with app.app_context():
+        if command == 'create':
+            print(f"Snapshot written to {create_snapshot()}")
+        elif command == 'restore':
+            restore_snapshot()
+            print("Database restored from snapshot")
+        else:
+            print("Usage: python snapshots.py [create|restore]")
+            sys.exit(1)
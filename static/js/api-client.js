@@ -2,6 +2,24 @@
 class APIClient {
     constructor() {
         this.baseURL = '';
+        this.bootstrapData = this.readBootstrap();
+    }
+
+    // Initial state rendered into the page by the server (see base.html)
+    readBootstrap() {
+        const element = document.getElementById('bootstrap-data');
+        if (!element) return {};
+
+        try {
+            return JSON.parse(element.textContent);
+        } catch (error) {
+            console.error('Invalid bootstrap data:', error);
+            return {};
+        }
+    }
+
+    bootstrap(key) {
+        return this.bootstrapData[key] || null;
     }
 
     async request(url, options = {}) {
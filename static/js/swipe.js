@@ -17,7 +17,15 @@ class SwipeManager {
         this.container = document.querySelector('.swipe-container');
         if (!this.container) return;
 
-        await this.loadProfiles();
+        // First deck comes embedded in the page, later reloads hit the API
+        const initialDeck = api.bootstrap('profiles');
+        if (initialDeck) {
+            this.currentProfiles = initialDeck.profiles || [];
+            this.currentIndex = 0;
+            showLoading(false);
+        } else {
+            await this.loadProfiles();
+        }
         this.setupEventListeners();
         this.renderCurrentCard();
     }
@@ -0,0 +1,63 @@
+"""Shared fixtures: seed once per session, snapshot, restore before every test.
+
+Each test starts from the same seeded dataset; restoring the SQLite snapshot
+takes milliseconds, so tests never re-run the seed inserts.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Top-level modules (app, models, ...) live in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Config reads these at import time - point the testing config at a throwaway directory
+_tmp_dir = tempfile.mkdtemp(prefix='guideswipe-tests-')
+os.environ.setdefault('TEST_DATABASE_URL', f"sqlite:///{os.path.join(_tmp_dir, 'test.db')}")
+os.environ.setdefault('TEST_SNAPSHOT_PATH', os.path.join(_tmp_dir, 'seed_snapshot.db'))
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    from models import db
+    from seed_data import create_demo_users
+    from snapshots import create_snapshot
+
+    app = create_app('testing')
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        create_demo_users()
+        create_snapshot()
+    return app
+
+
+@pytest.fixture(autouse=True)
+def seeded_db(app):
+    """Roll the database back to the seed snapshot before each test"""
+    from snapshots import restore_snapshot
+
+    with app.app_context():
+        restore_snapshot()
+    yield
+    with app.app_context():
+        from models import db
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(app):
+    """login(email) -> test client with that demo user's session"""
+    def _login(email, password='demo123'):
+        client = app.test_client()
+        response = client.post('/api/login', json={'email': email, 'password': password})
+        assert response.status_code == 200
+        return client
+    return _login
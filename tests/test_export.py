@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from archive import archive_match
+from models import db, Match, Message
+
+
+def test_since_with_utc_offset_is_normalised(app, login):
+    with app.app_context():
+        db.session.add(Match(user1_id=1, user2_id=2))
+        db.session.flush()
+        db.session.add_all([
+            Message(match_id=1, sender_id=1, content='archived-old', created_at=datetime(2025, 1, 1, 9, 0)),
+            Message(match_id=1, sender_id=1, content='archived-new', created_at=datetime(2025, 1, 1, 11, 0)),
+            Message(match_id=1, sender_id=2, content='hot', created_at=datetime(2025, 2, 1))
+        ])
+        db.session.commit()
+        archive_match(1, datetime(2025, 1, 2))
+
+    app.config['ADMIN_EMAILS'] = {'tourist@demo.com'}
+    try:
+        # 12:00+02:00 is 10:00 UTC - the 09:00 UTC message is older, the rest are newer
+        response = login('tourist@demo.com').get('/api/admin/export/messages?since=2025-01-01T12:00:00%2B02:00')
+        body = response.get_data(as_text=True)
+    finally:
+        app.config['ADMIN_EMAILS'] = set()
+
+    assert response.status_code == 200
+    assert 'archived-old' not in body
+    assert 'archived-new' in body and 'hot' in body
@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+import jobs
+from jobs import JobWorker, enqueue, run_pending
+from models import db, Job, Match, Message
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_mutual_swipe_welcome_message_is_sent_by_local_worker(app, login):
+    tourist = login('tourist@demo.com')
+    guide = login('anna@demo.com')
+    assert tourist.post('/api/swipe', json={'profile_id': 2, 'direction': 'right'}).status_code == 200
+    response = guide.post('/api/swipe', json={'profile_id': 1, 'direction': 'right'})
+    match_id = response.get_json()['match_data']['match_id']
+
+    # Swipe response does not wait for the message - the job is only queued
+    with app.app_context():
+        assert Message.query.filter_by(match_id=match_id).count() == 0
+        assert Job.query.filter_by(name='send_welcome_message', status='pending').count() == 1
+
+    worker = JobWorker(app, threads=1, poll_interval=0.05).start()
+    try:
+        def delivered():
+            with app.app_context():
+                return Message.query.filter_by(match_id=match_id).count() == 1
+        assert wait_for(delivered)
+    finally:
+        worker.stop()
+
+    with app.app_context():
+        message = Message.query.filter_by(match_id=match_id).one()
+        assert message.sender_id == 2  # Sent from the guide side
+        assert Job.query.filter_by(name='send_welcome_message').one().status == 'done'
+
+
+def test_job_is_dropped_when_transaction_rolls_back(app):
+    with app.app_context():
+        match = Match(user1_id=1, user2_id=3)
+        db.session.add(match)
+        db.session.flush()
+        enqueue('send_welcome_message', match_id=match.id)
+        db.session.rollback()
+
+        assert Job.query.count() == 0
+    assert run_pending(app) == 0
+
+
+def test_failing_job_retries_with_backoff_then_fails(app, monkeypatch):
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        raise RuntimeError('boom')
+
+    monkeypatch.setitem(jobs._handlers, 'flaky', flaky)
+    base = app.config['JOBS_RETRY_BASE_SECONDS']
+
+    with app.app_context():
+        job_row = enqueue('flaky', max_attempts=3)
+        db.session.commit()
+        job_id = job_row.id
+
+    assert run_pending(app) == 1
+    with app.app_context():
+        job_row = db.session.get(Job, job_id)
+        assert (job_row.status, job_row.attempts, job_row.last_error) == ('pending', 1, 'boom')
+        delay = (job_row.run_at - datetime.utcnow()).total_seconds()
+        assert base - 2 < delay <= base
+
+    # Not due yet - nothing runs
+    assert run_pending(app) == 0
+
+    # Second attempt waits twice as long
+    with app.app_context():
+        db.session.get(Job, job_id).run_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+    assert run_pending(app) == 1
+    with app.app_context():
+        job_row = db.session.get(Job, job_id)
+        delay = (job_row.run_at - datetime.utcnow()).total_seconds()
+        assert job_row.attempts == 2 and 2 * base - 2 < delay <= 2 * base
+
+    # Last attempt marks it failed for good
+    with app.app_context():
+        db.session.get(Job, job_id).run_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+    assert run_pending(app) == 1
+    with app.app_context():
+        assert db.session.get(Job, job_id).status == 'failed'
+    assert len(calls) == 3
+    assert run_pending(app) == 0
+
+
+def test_failed_status_commit_does_not_duplicate_welcome_message(app, login):
+    tourist = login('tourist@demo.com')
+    guide = login('anna@demo.com')
+    tourist.post('/api/swipe', json={'profile_id': 2, 'direction': 'right'})
+    match_id = guide.post('/api/swipe', json={'profile_id': 1, 'direction': 'right'})\
+                    .get_json()['match_data']['match_id']
+
+    failures = []
+
+    def fail_first_done_commit(session):
+        finished = [o for o in session.dirty if isinstance(o, Job) and o.status == 'done']
+        if finished and not failures:
+            failures.append(1)
+            raise OperationalError('COMMIT', {}, Exception('database is locked'))
+
+    event.listen(Session, 'before_commit', fail_first_done_commit)
+    try:
+        assert run_pending(app) == 1
+    finally:
+        event.remove(Session, 'before_commit', fail_first_done_commit)
+
+    with app.app_context():
+        job_row = Job.query.filter_by(name='send_welcome_message').one()
+        assert failures and job_row.status == 'pending' and job_row.attempts == 1
+        assert Message.query.filter_by(match_id=match_id).count() == 0  # Rolled back with the status
+        job_row.run_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+    assert run_pending(app) == 1
+    with app.app_context():
+        assert Message.query.filter_by(match_id=match_id).count() == 1
+        assert Job.query.filter_by(name='send_welcome_message').one().status == 'done'
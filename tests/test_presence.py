@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Profile
+from presence import presence
+
+
+def test_failed_flush_keeps_timestamps_for_the_next_one(app, monkeypatch):
+    seen = datetime.utcnow() + timedelta(minutes=5)  # newer than the seeded last_active
+    monkeypatch.setattr(presence, '_ensure_flusher', lambda: None)
+    monkeypatch.setattr(presence, '_seen', {})  # drop what earlier tests' logins queued
+    presence.touch(1, seen)
+
+    def locked(*args, **kwargs):
+        raise RuntimeError('database is locked')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(db.session, 'execute', locked)
+        with pytest.raises(RuntimeError):
+            presence.flush()
+
+    assert presence.flush() == 1
+    with app.app_context():
+        assert Profile.query.filter_by(user_id=1).one().last_active == seen
@@ -0,0 +1,17 @@
+from models import db, Review, User
+from snapshots import restore_snapshot
+
+
+def test_restore_snapshot_brings_back_the_seeded_rows(app):
+    with app.app_context():
+        # The autouse fixture has just restored the seed - these are its counts
+        seeded = {'users': User.query.count(), 'reviews': Review.query.count()}
+        assert seeded['users'] > 0 and seeded['reviews'] > 0
+
+        Review.query.delete()
+        User.query.filter(User.email.like('reviewer%@demo.com')).delete(synchronize_session=False)
+        db.session.commit()
+        assert Review.query.count() == 0
+
+        restore_snapshot()
+        assert {'users': User.query.count(), 'reviews': Review.query.count()} == seeded
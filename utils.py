@@ -1,6 +1,9 @@
-from models import db, User, Profile, Match, Swipe, ProfileType, SwipeDirection
+from flask import current_app
+from models import db, User, Profile, Match, Message, Review, Swipe, ProfileType, SwipeDirection
+from images import thumbnail_filename
 from datetime import datetime
 import random
+import os
 
 def create_match_if_mutual(user1_id, user2_id):
     """Check if both users liked each other and create match"""
@@ -115,22 +118,34 @@ def generate_mock_profiles(count=10):
             specialties=data["specialties"],
             languages=data["languages"],
             hourly_rate=data["hourly_rate"],
-            average_rating=data["rating"],
-            total_reviews=random.randint(15, 50),
             profile_type=ProfileType.GUIDE
         )
+        review_count = random.randint(15, 50)
+        profile.set_rating_aggregates(round(data["rating"] * review_count), review_count)
         profiles.append(profile)
     
     return profiles
 
 
+def parse_fields(raw, allowed):
+    """Parse a `fields=a,b,c` query parameter. None means all fields."""
+    if not raw:
+        return None
+    
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    
+    return fields
+
 def calculate_points_for_booking(guide_hourly_rate, duration_hours=2):
     """Calculate points needed for booking"""
     base_cost = guide_hourly_rate * duration_hours
     return int(base_cost * 0.8)  # 20% platform discount
 
 def send_welcome_message(match_id):
-    """Send automated welcome message for new matches"""
+    """Send automated welcome message for new matches (caller commits - run_job, with the job's status)"""
     welcome_messages = [
         "Cześć! Cieszę się, że się poznajemy! 😊",
         "Hej! Gotowy/a na niesamowitą przygodę po mieście?",
@@ -138,9 +153,20 @@ def send_welcome_message(match_id):
         "Cześć! Mam dla Ciebie kilka świetnych pomysłów na zwiedzanie!"
     ]
     
-    # This would send an automated message from the guide
-    # Implementation depends on business logic
-    pass
+    match = Match.query.get(match_id)
+    if not match:
+        return None
+    
+    # Sent from the guide side of the match
+    sender = match.user2 if match.user2.profile and match.user2.profile.is_guide() else match.user1
+    
+    message = Message(
+        match_id=match.id,
+        sender_id=sender.id,
+        content=random.choice(welcome_messages)
+    )
+    db.session.add(message)
+    return message
 
 def validate_image_upload(file):
     """Validate uploaded image file"""
@@ -153,16 +179,28 @@ def validate_image_upload(file):
     if extension not in allowed_extensions:
         return False, f"Allowed extensions: {', '.join(allowed_extensions)}"
     
-    # Check file size (max 5MB)
-    file.seek(0, 2)  # Seek to end
-    file_size = file.tell()
-    file.seek(0)  # Reset
-    
-    if file_size > 5 * 1024 * 1024:
-        return False, "File too large (max 5MB)"
+    # Declared part size, if the client sent one - the copy in
+    # images.save_upload_stream enforces the limit on the actual bytes
+    max_size = current_app.config['MAX_IMAGE_SIZE']
+    if file.content_length and file.content_length > max_size:
+        return False, f"File too large (max {max_size // (1024 * 1024)}MB)"
     
     return True, "Valid"
 
+def set_profile_photo(user_id, digest, sizes):
+    """Point the profile at its resized variants (call once they exist on disk). Returns variant URLs."""
+    # UPLOAD_FOLDER lives under the static folder, so its URL mirrors the path
+    upload_dir = os.path.join(current_app.root_path, current_app.config['UPLOAD_FOLDER'])
+    url_prefix = os.path.relpath(upload_dir, current_app.static_folder).replace(os.sep, '/')
+    variants = {
+        name: f"{current_app.static_url_path}/{url_prefix}/{thumbnail_filename(digest, name)}"
+        for name in sizes
+    }
+    profile = Profile.query.filter_by(user_id=user_id).first()
+    profile.photo_url = variants['card']
+    profile.photos = [variants[name] for name in sorted(sizes, key=sizes.get)]
+    return variants
+
 def get_user_statistics(user_id):
     """Get user statistics for profile"""
     user = User.query.get(user_id)
@@ -185,3 +223,66 @@ def get_user_statistics(user_id):
         'total_likes_received': total_likes_received,
         'match_rate': round(total_matches / max(total_swipes_sent, 1) * 100, 1)
     }
+
+def add_review(reviewer_id, guide_id, rating, comment=None):
+    """Store a review and bump the guide's aggregates in the same transaction"""
+    profile = Profile.query.filter_by(user_id=guide_id).first()
+    if not profile or not profile.is_guide():
+        raise ValueError("Reviewed user is not a guide")
+    
+    # Only people who matched with the guide may review, once
+    matched = db.session.query(Match.query.filter(
+        Match.user1_id == min(reviewer_id, guide_id),
+        Match.user2_id == max(reviewer_id, guide_id)
+    ).exists()).scalar()
+    if not matched:
+        raise ValueError("You can only review guides you have matched with")
+    
+    if Review.query.filter_by(reviewer_id=reviewer_id, guide_id=guide_id).first():
+        raise ValueError("You have already reviewed this guide")
+    
+    review = Review(reviewer_id=reviewer_id, guide_id=guide_id, rating=rating, comment=comment)
+    db.session.add(review)
+    profile.update_rating(rating)
+    return review
+
+def reconcile_rating_aggregates(fix=True):
+    """Check profile rating aggregates against the raw reviews table.
+    
+    Returns the mismatches found; with fix=True they are also repaired in one
+    correlated UPDATE, so a review committed meanwhile is never overwritten.
+    """
+    profiles = Profile.__table__.c
+    review_sum = db.select(db.func.coalesce(db.func.sum(Review.rating), 0))\
+                   .where(Review.guide_id == profiles.user_id).scalar_subquery()
+    review_count = db.select(db.func.count(Review.id))\
+                     .where(Review.guide_id == profiles.user_id).scalar_subquery()
+    weighted = (Profile.RATING_PRIOR_MEAN * Profile.RATING_PRIOR_WEIGHT + review_sum) * 1.0 \
+        / (Profile.RATING_PRIOR_WEIGHT + review_count)
+    
+    out_of_sync = db.or_(
+        profiles.rating_sum != review_sum,
+        db.func.coalesce(profiles.total_reviews, 0) != review_count,
+        profiles.weighted_rating.is_(None),
+        db.func.abs(profiles.weighted_rating - weighted) > 1e-9  # e.g. rows from before the prior default
+    )
+    
+    mismatches = [
+        {'user_id': user_id, 'stored': [stored_sum, stored_count], 'actual': [actual_sum, actual_count]}
+        for user_id, stored_sum, stored_count, actual_sum, actual_count in db.session.execute(
+            db.select(profiles.user_id, profiles.rating_sum, profiles.total_reviews, review_sum, review_count)
+              .where(out_of_sync)
+        )
+    ]
+    
+    if fix and mismatches:
+        db.session.execute(
+            db.update(Profile.__table__).where(out_of_sync).values(
+                rating_sum=review_sum,
+                total_reviews=review_count,
+                average_rating=db.case((review_count > 0, review_sum * 1.0 / review_count), else_=0.0),
+                weighted_rating=weighted
+            )
+        )
+        db.session.commit()
+    return mismatches